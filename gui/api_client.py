@@ -0,0 +1,76 @@
+import logging
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from main_config import api_base_url
+
+logger = logging.getLogger("payroll.client")
+
+# (connect, read) seconds; requests has no default and would wait forever
+DEFAULT_TIMEOUT = (3.05, 30)
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.3  # seconds, doubled on each retry
+RETRY_STATUSES = (502, 503, 504)
+POOL_SIZE = 8  # keep-alive sockets; at least the dispatcher's worker count
+SLOW_CALL_SECONDS = 1.0
+
+
+class ApiClient:
+    """One keep-alive session shared by every window of the GUI.
+
+    Failed connections are retried for any method, since nothing reached the
+    server. Read errors and 502/503/504 responses are retried only for
+    idempotent methods, so a POST is never sent twice."""
+
+    def __init__(self, base_url=api_base_url, timeout=DEFAULT_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.token = None
+
+        retry = Retry(
+            total=MAX_RETRIES,
+            backoff_factor=RETRY_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}),
+            raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def set_token(self, token):
+        self.token = token
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        else:
+            self.session.headers.pop("Authorization", None)
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.exceptions.RequestException as e:
+            logger.warning("%s %s failed after %.0f ms: %s",
+                           method, path, (time.perf_counter() - start) * 1000, e)
+            raise
+        elapsed = time.perf_counter() - start
+        logger.log(logging.WARNING if elapsed >= SLOW_CALL_SECONDS else logging.DEBUG,
+                   "%s %s -> %s in %.0f ms", method, path, response.status_code, elapsed * 1000)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -1,19 +1,24 @@
 from tkinter import *
-from tkinter import ttk, messagebox, Toplevel
+from tkinter import ttk, messagebox, Toplevel, filedialog
 from tkcalendar import DateEntry
-import requests
-from main_config import api_base_url
+import os
+from dispatcher import RequestDispatcher, show_server_error
+from paged_tree import PagedTreeview, PageCache
+from change_sync import ChangeSync
 from projects_view import ProjectManager
 from user_creation import UserCreationWindow
 from datetime import datetime
 
 class App:
-    def __init__(self, token, role):
-        self.token = token
+    def __init__(self, api, role):
+        self.api = api  # shared ApiClient, already holding the login token
         self.role = role
+        # Kept across pay record windows so reopening one revalidates with its ETag
+        self.pay_record_cache = PageCache()
 
         self.root = Tk()
-        self.api_url = api_base_url
+        self.dispatcher = RequestDispatcher(self.root, on_busy=self.set_busy)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill="both", expand=True)
@@ -21,7 +26,7 @@ class App:
         self.employee_tab = Frame(self.notebook)
         self.notebook.add(self.employee_tab, text="Employees")
 
-        self.project_tab = ProjectManager(self.notebook, self.api_url, self.token)
+        self.project_tab = ProjectManager(self.notebook, self.api, self.dispatcher)
         self.notebook.add(self.project_tab, text="Projects")
 
         version = "0.0.27"
@@ -29,7 +34,15 @@ class App:
 
         self.init_ui()
         ttk.Label(self.root, text=f"Logged in as role: {role}").pack(pady=10)
-        self.load_employees()
+        self.init_status_bar()
+
+        # Lists load once, then follow the server's change feed
+        self.sync = ChangeSync(
+            self.root, self.api, self.dispatcher,
+            handlers={"EMPLOYEE": self.apply_employee_change,
+                      "PROJECT": self.project_tab.apply_change},
+            on_reset=self.load_all)
+        self.sync.start()
 
         if self.role == 'super_admin':
             ttk.Button(self.root, text="Create New User", command=self.open_user_creation).pack(pady=10)
@@ -39,16 +52,53 @@ class App:
         self.init_buttons()
 
     def init_employee_view(self):
-        self.tree = ttk.Treeview(
-            self.employee_tab,
+        # Rows are fetched a page at a time as the list is scrolled
+        self.employee_list = PagedTreeview(
+            self.employee_tab, self.api, self.dispatcher, "/employees",
             columns=("ID", "First", "Last", "Rate"),
-            show="headings")
+            key="employee_id",
+            row_values=lambda emp: (
+                emp['employee_id'],
+                emp['firstname'],
+                emp['lastname'],
+                emp['daily_rate']
+            ),
+            error_message="Failed to load employees")
+        self.tree = self.employee_list.tree
         self.tree.heading("ID", text="ID")
         self.tree.heading("First", text="First Name")
         self.tree.heading("Last", text="Surname")
         self.tree.heading("Rate", text="Daily Rate")
-        self.tree.pack(fill="both", expand=True, padx=10, pady=5)
+        self.employee_list.pack(fill="both", expand=True, padx=10, pady=5)
+
 
+    def init_status_bar(self):
+        self.status_bar = Frame(self.root)
+        self.status_bar.pack(side="bottom", fill="x", padx=10, pady=(0, 5))
+        self.busy_label = ttk.Label(self.status_bar, text="")
+        self.busy_label.pack(side="left")
+        self.busy_bar = ttk.Progressbar(self.status_bar, mode="indeterminate", length=120)
+
+    def set_busy(self, busy):
+        # Called by the dispatcher when the first call starts and the last one finishes
+        if not hasattr(self, "busy_bar"):
+            return
+        if busy:
+            self.busy_label.config(text="Loading...")
+            self.busy_bar.pack(side="right")
+            self.busy_bar.start(10)
+            self.root.config(cursor="watch")
+        else:
+            self.busy_bar.stop()
+            self.busy_bar.pack_forget()
+            self.busy_label.config(text="")
+            self.root.config(cursor="")
+
+    def close(self):
+        self.sync.stop()
+        self.dispatcher.shutdown()
+        self.api.close()
+        self.root.destroy()
 
     def init_buttons(self):
         self.button_frame = Frame(self.employee_tab)
@@ -56,6 +106,8 @@ class App:
 
         Button(self.button_frame, text="Add...", command=self.add_employee) \
             .grid(row=0, column=0, padx=5)
+        Button(self.button_frame, text="Import CSV...", command=self.import_employees) \
+            .grid(row=1, column=0, padx=5)
         Button(self.button_frame, text="Edit", command=self.edit_employee) \
             .grid(row=0, column=1, padx=5)
         Button(self.button_frame, text="Delete", command=self.delete_employee) \
@@ -67,23 +119,19 @@ class App:
         Button(self.button_frame, text="View Pay Record", command=self.view_pay_record) \
             .grid(row=1, column=2, padx=5)
 
+    def load_all(self):
+        # Both lists load concurrently
+        self.load_employees()
+        self.project_tab.load_projects()
+
     def load_employees(self):
-        try:
-            response = requests.get(f"{self.api_url}/employees", headers={"Authorization": f"Bearer {self.token}"})
-            if response.status_code == 200:
-                employees = response.json()
-                self.tree.delete(*self.tree.get_children())
-                for emp in employees:
-                    self.tree.insert("", "end", values=(
-                        emp['employee_id'],
-                        emp['firstname'],
-                        emp['lastname'],
-                        emp['daily_rate']
-                    ))
-            else:
-                messagebox.showerror("Error", "Failed to load employees")
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Connection Error", f"Could not connect to server: {e}")
+        self.employee_list.reload()
+
+    def apply_employee_change(self, change):
+        if change["row"] is None:
+            self.employee_list.remove_row(change["row_id"])
+        else:
+            self.employee_list.put_row(change["row"])
 
 
     def add_employee(self):
@@ -109,22 +157,27 @@ class App:
         self.rate_entry.grid(row=3, column=1, padx=5, pady=10)
 
         def save():
-            data = {
-                "firstname": self.fname_entry.get(),
-                "lastname": self.lname_entry.get(),
-                "daily_rate": float(self.rate_entry.get())
-            }
             try:
-                response = requests.post(f"{self.api_url}/employees", json=data, headers={"Authorization": f"Bearer {self.token}"})
+                data = {
+                    "firstname": self.fname_entry.get(),
+                    "lastname": self.lname_entry.get(),
+                    "daily_rate": float(self.rate_entry.get())
+                }
+            except ValueError:
+                messagebox.showerror("Error", "Daily rate must be a number")
+                return
+
+            def saved(response):
                 if response.status_code == 201:
-                    self.load_employees()  # Refresh the list
+                    employee = response.json()
+                    self.employee_list.put_row({"employee_id": employee["id"], **data})
                     self.popup.destroy()
                 else:
                     messagebox.showerror("Error", "Failed to add employee")
-            except ValueError:
-                messagebox.showerror("Error", "Daily rate must be a number")
-            except requests.exceptions.RequestException as e:
-                messagebox.showerror("Error", f"Server error: {e}")
+
+            self.dispatcher.submit(
+                lambda: self.api.post("/employees", json=data),
+                saved, show_server_error)
 
         Button(self.popup, text="Save", command=save).grid(
             row=4, 
@@ -133,6 +186,45 @@ class App:
         )
     
 
+    def import_employees(self):
+        path = filedialog.askopenfilename(
+            title="Import Employees",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not read file: {e}")
+            return
+
+        def imported(response):
+            if response.status_code not in (201, 400):
+                messagebox.showerror("Error", f"Failed to import employees: {response.text}")
+                return
+
+            result = response.json()
+            if "error" in result:
+                # The file as a whole was rejected, e.g. not UTF-8
+                messagebox.showerror("Import Employees", result["error"])
+                return
+            errors = result.get("errors", [])
+            message = f"Imported {len(result.get('created', []))} employee(s)."
+            if errors:
+                # Rows are reported 1-based after the CSV header line
+                details = "\n".join(f"Row {e['row'] + 1}: {e['error']}" for e in errors[:10])
+                message += f"\n{len(errors)} row(s) skipped:\n{details}"
+            messagebox.showinfo("Import Employees", message)
+            self.sync.sync_now()  # pick up the new rows from the change feed
+
+        self.dispatcher.submit(
+            lambda: self.api.post(
+                "/employees/bulk",
+                files={"file": (os.path.basename(path), content)}),
+            imported, show_server_error)
+
     def edit_employee(self):
         selected = self.tree.selection()
         if not selected:
@@ -141,11 +233,7 @@ class App:
         
         employee_id = self.tree.item(selected[0])['values'][0]
 
-        try:
-            response = requests.get(
-                f"{self.api_url}/employees/{employee_id}",
-                headers={"Authorization": f"Bearer {self.token}"}
-            )
+        def fetched(response):
             if response.status_code != 200:
                 messagebox.showerror("Error", "Employee not found")
                 return
@@ -185,29 +273,22 @@ class App:
                     "daily_rate": new_rate
                 }
 
-                try:
-                    update_response = requests.put(
-                        f"{self.api_url}/employees/{employee_id}",
-                        headers={
-                            "Authorization": f"Bearer {self.token}",
-                            "Content-Type": "application/json"
-                        },
-                        json=update_data
-                    )
-
+                def updated(update_response):
                     if update_response.status_code == 200:
-                        self.load_employees()
+                        self.employee_list.put_row({"employee_id": employee_id, **update_data})
                         self.edit_popup.destroy()
                     else:
                         messagebox.showerror("Error", "Failed to update employee")
 
-                except requests.exceptions.RequestException as e:
-                    messagebox.showerror("Error", f"Server error: {e}")
+                self.dispatcher.submit(
+                    lambda: self.api.put(f"/employees/{employee_id}", json=update_data),
+                    updated, show_server_error)
 
             Button(self.edit_popup, text="Save", command=save).grid(row=3, columnspan=2, pady=10)
 
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Error", f"Could not connect to server: {e}")
+        self.dispatcher.submit(
+            lambda: self.api.get(f"/employees/{employee_id}"),
+            fetched)
 
 
     def delete_employee(self):
@@ -221,14 +302,15 @@ class App:
         confirm = messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this employee?")
 
         if confirm:
-            try:
-                response = requests.delete(f"{self.api_url}/employees/{employee_id}", headers={"Authorization": f"Bearer {self.token}"})
+            def deleted(response):
                 if response.status_code == 200:
-                    self.load_employees()  # Refresh the list
+                    self.employee_list.remove_row(employee_id)
                 else:
                     messagebox.showerror("Error", "Failed to delete employee")
-            except requests.exceptions.RequestException as e:
-                messagebox.showerror("Error", f"Server error: {e}")
+
+            self.dispatcher.submit(
+                lambda: self.api.delete(f"/employees/{employee_id}"),
+                deleted, show_server_error)
 
     def view_project_assignments(self):
         selected = self.tree.selection()
@@ -241,21 +323,20 @@ class App:
         popup = Toplevel(self.root)
         popup.title(f"{first} {last} - Project Assignments")
         
-        try:
-            response = requests.get(f"{self.api_url}/deployments/employee/{employee_id}", headers={"Authorization": f"Bearer {self.token}"})
+        tree = ttk.Treeview(popup, columns=("Project", "Date", "Time In", "Time Out", "Hours", "OT"), show="headings")
+        tree.heading("Project", text="Project")
+        tree.heading("Date", text="Date")
+        tree.heading("Time In", text="Time In")
+        tree.heading("Time Out", text="Time Out")
+        tree.heading("Hours", text="Hours")
+        tree.heading("OT", text="Overtime")
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        def loaded(response):
             if response.status_code != 200:
                 messagebox.showerror("Error", "Failed to load assignments")
                 return
-            
-            tree = ttk.Treeview(popup, columns=("Project", "Date", "Time In", "Time Out", "Hours", "OT"), show="headings")
-            tree.heading("Project", text="Project")
-            tree.heading("Date", text="Date")
-            tree.heading("Time In", text="Time In")
-            tree.heading("Time Out", text="Time Out")
-            tree.heading("Hours", text="Hours")
-            tree.heading("OT", text="Overtime")
-            tree.pack(fill="both", expand=True, padx=10, pady=10)
-            
+
             for assignment in response.json():
                 tree.insert("", "end", values=(
                     assignment['project_name'],
@@ -265,9 +346,10 @@ class App:
                     assignment['attendance_hours'],
                     assignment['overtime_hours']
                 ))
-                
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Error", f"Could not connect to server: {e}")
+
+        self.dispatcher.submit(
+            lambda: self.api.get(f"/deployments/employee/{employee_id}"),
+            loaded)
 
     def calculate_payroll(self):
         selected = self.tree.selection()
@@ -325,14 +407,22 @@ class App:
             start_date = self.start_date_entry.get_date().isoformat()
             end_date = self.end_date_entry.get_date().isoformat()
             deductions = float(self.deductions_entry.get())
-            
-            # Get time logs for the period
-            response = requests.get(
-                f"{self.api_url}/deployments/employee/{emp_id}",
-                headers={"Authorization": f"Bearer {self.token}"},
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid input: {e}")
+            return
+
+        # Get time logs for the period
+        self.dispatcher.submit(
+            lambda: self.api.get(
+                f"/deployments/employee/{emp_id}",
                 params={"start_date": start_date, "end_date": end_date}
-            )
-            
+            ),
+            lambda response: self._show_payroll_calculation(
+                response, emp_id, first, last, daily_rate, start_date, end_date, deductions),
+            show_server_error)
+
+    def _show_payroll_calculation(self, response, emp_id, first, last, daily_rate, start_date, end_date, deductions):
+        try:
             if response.status_code != 200:
                 messagebox.showerror("Error", "Failed to fetch time logs")
                 return
@@ -406,93 +496,72 @@ class App:
             
         except ValueError as e:
             messagebox.showerror("Error", f"Invalid input: {e}")
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Error", f"Server error: {e}")
 
     def _save_payroll_record(self, emp_id):
         if not hasattr(self, '_current_payroll_calc'):
             messagebox.showwarning("Warning", "Please calculate payroll first")
             return
-            
-        try:
+
+        payroll_calc = dict(self._current_payroll_calc)
+
+        def save():
             # First save the payroll record
-            response = requests.post(
-                f"{self.api_url}/payroll",
-                headers={"Authorization": f"Bearer {self.token}"},
-                json=self._current_payroll_calc
-            )
-            
-            if response.status_code == 201:
-                payroll_data = response.json()
-                
-                # Create a pay record associated with this payroll
-                pay_record_data = {
-                    'employee_id': emp_id,
-                    'date_paid': datetime.now().strftime('%Y-%m-%d'),  # Current date
-                    'amount': self._current_payroll_calc['net_salary'],
-                    'reference_number': f"PY{datetime.now().strftime('%Y%m%d%H%M%S')}"  # Unique reference
-                }
-                
-                pay_record_response = requests.post(
-                    f"{self.api_url}/payrecords",
-                    headers={"Authorization": f"Bearer {self.token}"},
-                    json=pay_record_data
-                )
-                
-                if pay_record_response.status_code == 201:
-                    messagebox.showinfo("Success", "Payroll and payment records saved successfully")
-                    self.payroll_popup.destroy()
-                else:
-                    messagebox.showerror("Error", f"Payroll saved but payment record failed: {pay_record_response.text}")
-            else:
+            response = self.api.post("/payroll", json=payroll_calc)
+            if response.status_code != 201:
+                return response, None
+
+            # Create a pay record associated with this payroll
+            pay_record_data = {
+                'employee_id': emp_id,
+                'date_paid': datetime.now().strftime('%Y-%m-%d'),  # Current date
+                'amount': payroll_calc['net_salary'],
+                'reference_number': f"PY{datetime.now().strftime('%Y%m%d%H%M%S')}"  # Unique reference
+            }
+
+            pay_record_response = self.api.post("/payrecords", json=pay_record_data)
+            return response, pay_record_response
+
+        def saved(responses):
+            response, pay_record_response = responses
+            if response.status_code != 201:
                 messagebox.showerror("Error", f"Failed to save payroll record: {response.text}")
-                
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Error", f"Server error: {e}")
+            elif pay_record_response.status_code == 201:
+                messagebox.showinfo("Success", "Payroll and payment records saved successfully")
+                self.payroll_popup.destroy()
+            else:
+                messagebox.showerror("Error", f"Payroll saved but payment record failed: {pay_record_response.text}")
+
+        self.dispatcher.submit(save, saved, show_server_error)
     
     def view_pay_record(self):
-        if not self.token:
+        if not self.api.token:
             messagebox.showerror("Error", "You must be logged in to view pay records.")
             return
 
-        headers = {
-            "Authorization": f"Bearer {self.token}"
-        }
-
-        try:
-            response = requests.get(f"{self.api_url}/payrecords", headers=headers)
-            if response.status_code == 200:
-                records = response.json()
-
-                # Create a new window
-                window = Toplevel(self.root)
-                window.title("Pay Records")
-                window.geometry("800x400")
-
-                # Create Treeview
-                cols = ("Pay ID", "Employee", "Date Paid", "Amount", "Reference No.")
-                tree = ttk.Treeview(window, columns=cols, show="headings")
-
-                for col in cols:
-                    tree.heading(col, text=col)
-                    tree.column(col, width=150)
-
-                for record in records:
-                    employee_name = f"{record['firstname']} {record['lastname']}"
-                    tree.insert("", "end", values=(
-                        record["pay_id"],
-                        employee_name,
-                        record["date_paid"],
-                        f"₱{record['amount']:,.2f}",
-                        record["reference_number"]
-                    ))
-
-                    tree.pack(fill="both", expand=True, padx=10, pady=10)
-
-            else:
-                messagebox.showerror("Error", f"Failed to fetch records: {response.text}")
-        except requests.RequestException as e:
-                messagebox.showerror("Error", f"Request failed: {str(e)}")
+        # Create a new window
+        window = Toplevel(self.root)
+        window.title("Pay Records")
+        window.geometry("800x400")
+
+        # Newest first, fetched a page at a time as the list is scrolled
+        cols = ("Pay ID", "Employee", "Date Paid", "Amount", "Reference No.")
+        records = PagedTreeview(
+            window, self.api, self.dispatcher, "/payrecords", cols, key="pay_id",
+            row_values=lambda record: (
+                record["pay_id"],
+                f"{record['firstname']} {record['lastname']}",
+                record["date_paid"],
+                f"₱{record['amount']:,.2f}",
+                record["reference_number"]
+            ),
+            error_message="Failed to fetch records", cache=self.pay_record_cache)
+
+        for col in cols:
+            records.tree.heading(col, text=col)
+            records.tree.column(col, width=150)
+
+        records.pack(fill="both", expand=True, padx=10, pady=10)
+        records.reload()
         
     def open_user_creation(self):
-        UserCreationWindow(self.root, api_url=api_base_url, token=self.token)
\ No newline at end of file
+        UserCreationWindow(self.root, api=self.api, dispatcher=self.dispatcher)
\ No newline at end of file
@@ -0,0 +1,250 @@
+"""asyncio server mode for the payroll API.
+
+Connections are parsed and held by an asyncio event loop, so thousands of
+idle or slow keep-alive clients cost a socket each rather than a thread.
+Every request is dispatched to the same Flask app (same /api routes, same
+authorize checks) on a bounded thread pool, where the blocking sqlite3
+and password-hash work happens. Streamed responses are pulled from the app
+on that pool too.
+
+    python async_server.py --port 5000 --db-threads 16
+"""
+import argparse
+import asyncio
+import contextvars
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import unquote_to_bytes
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 32 * 1024 * 1024
+NO_BODY_STATUSES = (204, 304)
+
+
+class BadRequest(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def simple_response(status, message, keep_alive=False):
+    body = f'{{"error": "{message}"}}'.encode()
+    return (f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n').encode() + body
+
+
+class AsyncAPIServer:
+    def __init__(self, app, db_threads=16, max_pending=256, keepalive_timeout=75, queue_timeout=10):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix='api')
+        # Bounds requests queued for or running on the pool; past that, clients get 503
+        self.slots = asyncio.Semaphore(db_threads + max_pending)
+        self.keepalive_timeout = keepalive_timeout
+        self.queue_timeout = queue_timeout
+        self.connections = 0
+
+    async def read_request(self, reader):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.LimitOverrunError:
+            raise BadRequest(431, 'Request headers too large')
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise BadRequest(400, 'Malformed request line')
+
+        headers = []
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, _, value = line.partition(':')
+            headers.append((name.strip().lower(), value.strip()))
+        return method, target, version, headers
+
+    async def read_body(self, reader, writer, headers):
+        lookup = dict(headers)
+        if lookup.get('expect', '').lower() == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+        if 'chunked' in lookup.get('transfer-encoding', '').lower():
+            body = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    return bytes(body)
+                body += await reader.readexactly(size)
+                await reader.readline()
+                if len(body) > MAX_BODY_BYTES:
+                    raise BadRequest(413, 'Request body too large')
+
+        length = int(lookup.get('content-length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise BadRequest(413, 'Request body too large')
+        return await reader.readexactly(length) if length else b''
+
+    def build_environ(self, method, target, version, headers, body, writer):
+        path, _, query = target.partition('?')
+        peer = writer.get_extra_info('peername') or ('', 0)
+        sock = writer.get_extra_info('sockname') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote_to_bytes(path).decode('latin-1'),
+            'QUERY_STRING': query,
+            'SERVER_NAME': str(sock[0]),
+            'SERVER_PORT': str(sock[1]),
+            'SERVER_PROTOCOL': version,
+            'REMOTE_ADDR': str(peer[0]),
+            'REMOTE_PORT': str(peer[1]),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers:
+            if name == 'content-type':
+                environ['CONTENT_TYPE'] = value
+            elif name not in ('content-length', 'transfer-encoding'):
+                key = 'HTTP_' + name.upper().replace('-', '_')
+                environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+    def call_app(self, environ):
+        # Runs on the pool: the view, its sqlite work and the first body chunk
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = response_headers
+            return lambda data: response.setdefault('written', []).append(data)
+
+        result = self.app(environ, start_response)
+        iterator = iter(result)
+        first = next(iterator, None)
+        return response, result, iterator, first
+
+    async def respond(self, writer, environ, keep_alive):
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            writer.write(simple_response(503, 'Server busy, try again', keep_alive))
+            return keep_alive
+
+        # Flask keeps its request and app contexts in context variables, and a
+        # streamed body is pulled on whichever pool thread is free, so every
+        # step of this response runs in the one context the view started in
+        ctx = contextvars.copy_context()
+        try:
+            response, result, iterator, first = await loop.run_in_executor(
+                self.executor, ctx.run, self.call_app, environ)
+            status_code = int(response['status'].split(' ', 1)[0])
+            header_names = {name.lower() for name, _ in response['headers']}
+            has_body = environ['REQUEST_METHOD'] != 'HEAD' and status_code not in NO_BODY_STATUSES
+            chunked = has_body and 'content-length' not in header_names
+
+            lines = [f"HTTP/1.1 {response['status']}"]
+            lines += [f'{name}: {value}' for name, value in response['headers']]
+            if chunked:
+                lines.append('Transfer-Encoding: chunked')
+            lines.append(f'Connection: {"keep-alive" if keep_alive else "close"}')
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+            try:
+                chunk = b''.join(response.get('written', [])) + (first or b'')
+                while has_body and chunk is not None:
+                    if chunk:
+                        writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+                        await writer.drain()
+                    chunk = await loop.run_in_executor(self.executor, ctx.run, next, iterator, None)
+                if chunked:
+                    writer.write(b'0\r\n\r\n')
+            finally:
+                # Also when the client went away mid-body, so the contexts are
+                # popped here rather than by garbage collection on the loop thread
+                if hasattr(result, 'close'):
+                    await loop.run_in_executor(self.executor, ctx.run, result.close)
+            return keep_alive
+        finally:
+            self.slots.release()
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    method, target, version, headers = await asyncio.wait_for(
+                        self.read_request(reader), self.keepalive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                connection = dict(headers).get('connection', '').lower()
+                keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+                body = await self.read_body(reader, writer, headers)
+                environ = self.build_environ(method, target, version, headers, body, writer)
+                if not await self.respond(writer, environ, keep_alive):
+                    break
+                await writer.drain()
+        except BadRequest as e:
+            writer.write(simple_response(e.status, str(e)))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port,
+                                            limit=MAX_HEADER_BYTES, backlog=4096)
+        print(f"Async API server listening on {host}:{port}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--db-threads', type=int, default=16, help='threads running requests and sqlite work')
+    parser.add_argument('--max-pending', type=int, default=256, help='requests that may queue for a thread')
+    parser.add_argument('--keepalive-timeout', type=float, default=75.0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    import server as api
+    api.init_db()
+    api.seed_default_users()
+
+    # The connection pool should be at least as large as the thread pool
+    api.db_pool.max_size = max(api.db_pool.max_size, args.db_threads)
+
+    async_server = AsyncAPIServer(api.app, db_threads=args.db_threads, max_pending=args.max_pending,
+                                  keepalive_timeout=args.keepalive_timeout)
+    try:
+        asyncio.run(async_server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        async_server.executor.shutdown(wait=True)
+        api.password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
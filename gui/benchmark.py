@@ -0,0 +1,286 @@
+"""Load-test harness for the payroll API.
+
+Runs a weighted mix of API calls from several worker threads for a fixed
+duration and reports throughput and p50/p95/p99 latency per endpoint as JSON.
+
+In-process (default): seeds a throwaway database and drives server.app
+through Flask's test client.
+    python benchmark.py --concurrency 8 --duration 30 --output before.json
+
+Against a running server (the database should already be seeded, e.g. with
+generate_dataset.py):
+    python benchmark.py --url http://localhost:5000/api --concurrency 32
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+# Relative weights of each operation in the mix
+WORKLOAD = {
+    'login': 1,
+    'list_employees': 10,
+    'get_employee': 10,
+    'create_employee': 3,
+    'update_employee': 3,
+    'delete_employee': 1,
+    'create_deployment': 8,
+    'create_payroll': 3,
+    'list_pay_records': 5,
+}
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, token=None, json=None, params=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.client.open(f'/api{path}', method=method, json=json,
+                                    query_string=params, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(self, method, path, token=None, json=None, params=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.session.request(method, f'{self.base_url}{path}', json=json,
+                                        params=params, headers=headers, timeout=60)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, body
+
+
+def seed_database(db_path, seed, employees, projects, days):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        'INSERT INTO EMPLOYEE (lastname, firstname, daily_rate) VALUES (?, ?, ?)',
+        [(f'Last{i}', f'First{i}', rng.choice([570, 610, 650, 700, 800]))
+         for i in range(employees)])
+    conn.executemany(
+        'INSERT INTO PROJECT (project_name, project_start, project_end, budget) VALUES (?, ?, ?, ?)',
+        [(f'Project {i}', '2024-01-01', '2026-12-31', rng.randint(100, 5000) * 1000)
+         for i in range(projects)])
+
+    start = date(2025, 1, 1)
+    deployments = []
+    for employee_id in range(1, employees + 1):
+        project_id = rng.randint(1, projects)
+        for day in range(days):
+            hours = rng.choice([8, 8, 8, 9, 10])
+            deployments.append((employee_id, project_id, '08:00', f'{8 + hours:02d}:00',
+                                max(0, hours - 8), (start + timedelta(days=day)).isoformat(), hours))
+    conn.executemany('''
+        INSERT INTO DEPLOYMENT_LIST
+        (employee_id, project_id, time_in, time_out, overtime_hours, date, attendance_hours)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', deployments)
+    conn.executemany(
+        'INSERT INTO PAY_RECORD (employee_id, date_paid, amount, reference_number) VALUES (?, ?, ?, ?)',
+        [(rng.randint(1, employees), (start + timedelta(days=rng.randrange(days))).isoformat(),
+          rng.randint(3000, 6000), i) for i in range(employees * 4)])
+    conn.commit()
+    conn.close()
+
+
+class Worker(threading.Thread):
+    def __init__(self, index, client, args, deadline, results):
+        super().__init__(daemon=True)
+        self.client = client
+        self.args = args
+        self.deadline = deadline
+        self.results = results
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.index = index
+        self.token = None
+        self.created = []
+        self.deployment_seq = 0
+        self.operations = list(WORKLOAD)
+        self.weights = [WORKLOAD[name] for name in self.operations]
+
+    def login(self):
+        status, body = self.client.request('POST', '/login', json={
+            'username': self.args.username, 'password': self.args.password})
+        if status == 200:
+            self.token = body['token']
+        return status
+
+    def list_employees(self):
+        return self.client.request('GET', '/employees', self.token, params={'limit': 100})[0]
+
+    def get_employee(self):
+        employee_id = self.rng.randint(1, self.args.employees)
+        return self.client.request('GET', f'/employees/{employee_id}', self.token)[0]
+
+    def create_employee(self):
+        status, body = self.client.request('POST', '/employees', self.token, json={
+            'lastname': f'Bench{self.index}', 'firstname': 'Worker', 'daily_rate': 650})
+        if status == 201:
+            self.created.append(body['id'])
+        return status
+
+    def update_employee(self):
+        employee_id = self.rng.choice(self.created) if self.created else self.rng.randint(1, self.args.employees)
+        return self.client.request('PUT', f'/employees/{employee_id}', self.token, json={
+            'lastname': f'Bench{self.index}', 'firstname': 'Updated',
+            'daily_rate': self.rng.choice([650, 700])})[0]
+
+    def delete_employee(self):
+        if not self.created:
+            return self.create_employee()
+        return self.client.request('DELETE', f'/employees/{self.created.pop()}', self.token)[0]
+
+    def create_deployment(self):
+        # Dates far past the seeded range keep (employee, project, date) unique per worker
+        self.deployment_seq += 1
+        day = date(2030, 1, 1) + timedelta(days=self.deployment_seq)
+        return self.client.request('POST', '/deployments', self.token, json={
+            'employee_id': self.index % self.args.employees + 1,
+            'project_id': self.rng.randint(1, self.args.projects),
+            'time_in': '08:00', 'time_out': '17:00', 'date': day.isoformat()})[0]
+
+    def create_payroll(self):
+        return self.client.request('POST', '/payroll', self.token, json={
+            'employee_id': self.rng.randint(1, self.args.employees),
+            'gross_salary': 4000, 'net_salary': 3600,
+            'week_start': '2025-01-06', 'week_end': '2025-01-12',
+            'deductions': [{'deduction_type': 'SSS', 'deduction_amount': 400}]})[0]
+
+    def list_pay_records(self):
+        return self.client.request('GET', '/payrecords', self.token, params={'limit': 100})[0]
+
+    def run(self):
+        self.login()
+        while time.perf_counter() < self.deadline:
+            name = self.rng.choices(self.operations, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                status = getattr(self, name)()
+            except Exception:
+                status = 0
+            elapsed = time.perf_counter() - start
+            self.results.append((name, elapsed, status < 400 and status != 0))
+
+
+def percentile(samples, p):
+    if not samples:
+        return None
+    return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+
+def summarize(results, elapsed):
+    by_name = {}
+    for name, seconds, ok in results:
+        entry = by_name.setdefault(name, {'samples': [], 'errors': 0})
+        entry['samples'].append(seconds)
+        if not ok:
+            entry['errors'] += 1
+
+    endpoints = {}
+    for name, entry in sorted(by_name.items()):
+        samples = sorted(entry['samples'])
+        endpoints[name] = {
+            'requests': len(samples),
+            'errors': entry['errors'],
+            'throughput_rps': round(len(samples) / elapsed, 2),
+            'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+            'p50_ms': percentile(samples, 0.50),
+            'p95_ms': percentile(samples, 0.95),
+            'p99_ms': percentile(samples, 0.99),
+            'max_ms': round(samples[-1] * 1000, 3),
+        }
+
+    all_samples = sorted(seconds for _, seconds, _ in results)
+    return {
+        'total': {
+            'requests': len(all_samples),
+            'errors': sum(e['errors'] for e in endpoints.values()),
+            'throughput_rps': round(len(all_samples) / elapsed, 2),
+            'p50_ms': percentile(all_samples, 0.50),
+            'p95_ms': percentile(all_samples, 0.95),
+            'p99_ms': percentile(all_samples, 0.99),
+        },
+        'endpoints': endpoints,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='API base URL; omit to run in-process')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--employees', type=int, default=500, help='seeded employees (in-process)')
+    parser.add_argument('--projects', type=int, default=20, help='seeded projects (in-process)')
+    parser.add_argument('--days', type=int, default=60, help='seeded days of deployments (in-process)')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        workdir = tempfile.mkdtemp(prefix='payroll-bench-')
+        os.environ['PAYROLL_DB_PATH'] = os.path.join(workdir, 'payroll_app.db')
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import server
+        server.init_db()
+        server.seed_default_users()
+        seed_database(server.DB_PATH, args.seed, args.employees, args.projects, args.days)
+        make_client = lambda: InProcessClient(server.app)
+
+    results = []
+    deadline = time.perf_counter() + args.duration
+    workers = [Worker(i, make_client(), args, deadline, results) for i in range(args.concurrency)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    report = {
+        'config': {
+            'target': args.url or 'in-process',
+            'concurrency': args.concurrency,
+            'duration_s': round(elapsed, 3),
+            'seed': args.seed,
+            'employees': args.employees,
+            'projects': args.projects,
+            'days': args.days,
+        },
+        **summarize(results, elapsed),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if not args.url:
+        server.password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import logging
+
+logger = logging.getLogger("payroll.client")
+
+SYNC_INTERVAL_MS = 15000
+
+
+class ChangeSync:
+    """Keeps the client's lists current from the server's /changes feed.
+
+    start() records the feed position and then calls on_reset() for the
+    first full load. After that, every interval only the rows changed since
+    the last position are fetched and handed to handlers[table](change),
+    where change['row'] is the row's current state or None if it is gone.
+    If the server has already compacted past our position (410), the lists
+    are reloaded in full from a fresh position."""
+
+    def __init__(self, root, api, dispatcher, handlers, on_reset, interval_ms=SYNC_INTERVAL_MS):
+        self.root = root
+        self.api = api
+        self.dispatcher = dispatcher
+        self.handlers = handlers
+        self.on_reset = on_reset
+        self.interval_ms = interval_ms
+        self.last_seq = None
+        self.in_flight = False
+        self.after_id = None
+
+    def start(self):
+        self.reset(initial=True)
+        self.schedule()
+
+    def reset(self, initial=False):
+        # The position is taken before the full load, so a change landing
+        # between the two is replayed rather than missed
+        def positioned(response):
+            self.in_flight = False
+            if response.status_code == 200:
+                self.last_seq = response.json()["last_seq"]
+            if self.last_seq is not None or initial:
+                self.on_reset()
+
+        def failed(e):
+            self.in_flight = False
+            if initial:
+                self.on_reset()  # reports the connection error once; later ticks retry quietly
+
+        self.in_flight = True
+        self.dispatcher.submit(lambda: self.api.get("/changes"), positioned, failed, quiet=not initial)
+
+    def sync_now(self):
+        if self.in_flight:
+            return
+        if self.last_seq is None:
+            self.reset()
+            return
+
+        params = {"since": self.last_seq, "tables": ",".join(self.handlers)}
+        self.in_flight = True
+        self.dispatcher.submit(
+            lambda: self.api.get("/changes", params=params),
+            self.apply, self.sync_failed, quiet=True)
+
+    def apply(self, response):
+        self.in_flight = False
+        if response.status_code == 410:
+            logger.info("Change log compacted past position %s; reloading", self.last_seq)
+            self.last_seq = None
+            self.reset()
+            return
+        if response.status_code != 200:
+            logger.warning("Change sync failed: HTTP %s", response.status_code)
+            return
+        body = response.json()
+        for change in body["changes"]:
+            handler = self.handlers.get(change["table"])
+            if handler:
+                handler(change)
+        self.last_seq = body["last_seq"]
+        if body.get("has_more"):
+            self.sync_now()
+
+    def sync_failed(self, e):
+        # Logged by the API client; the next tick tries again
+        self.in_flight = False
+
+    def schedule(self):
+        self.after_id = self.root.after(self.interval_ms, self.tick)
+
+    def tick(self):
+        self.sync_now()
+        self.schedule()
+
+    def stop(self):
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
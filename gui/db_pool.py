@@ -0,0 +1,209 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# PRAGMAs applied once to every pooled connection
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-20000",      # ~20 MB page cache per connection
+    "PRAGMA mmap_size=268435456",    # 256 MB memory-mapped I/O
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def is_busy_error(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+class PooledCursor:
+    """Counts statements that failed on a locked database. In WAL mode the
+    write lock is taken by the first write of a transaction, so that is where
+    SQLITE_BUSY surfaces, not at commit."""
+
+    def __init__(self, pool, cursor):
+        self._pool = pool
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _run(self, method, *args):
+        try:
+            method(*args)
+        except sqlite3.OperationalError as e:
+            if is_busy_error(e):
+                self._pool.count('busy_errors')
+            raise
+        return self
+
+    def execute(self, sql, params=()):
+        return self._run(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._run(self._cursor.executemany, sql, seq_of_params)
+
+
+class PooledConnection:
+    """Wraps a sqlite3 connection so that close() hands it back to the pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    @property
+    def released(self):
+        return self._released
+
+    def cursor(self):
+        return PooledCursor(self._pool, self._conn.cursor())
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def commit(self):
+        # busy_timeout already waited inside sqlite; retry a few more times
+        # before giving up on a commit that lost the race for the write lock
+        for attempt in range(self._pool.busy_retries + 1):
+            try:
+                self._conn.commit()
+                break
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e):
+                    raise
+                self._pool.count('busy_errors')
+                if attempt == self._pool.busy_retries:
+                    raise
+                self._pool.count('busy_retries')
+                time.sleep(0.05 * (attempt + 1))
+        self._pool.count('commits')
+
+    def rollback(self):
+        self._conn.rollback()
+        self._pool.count('rollbacks')
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn)
+
+
+class ConnectionPool:
+    def __init__(self, db_path, max_size=8, timeout=10.0, busy_retries=3):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.busy_retries = busy_retries
+
+        self._idle = deque()
+        self._created = 0
+        self._cond = threading.Condition()
+
+        self._acquired = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._counters = {'commits': 0, 'rollbacks': 0, 'busy_errors': 0, 'busy_retries': 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._created < self.max_size:
+                    self._created += 1
+                    conn = None
+                    break
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+
+            elapsed = time.perf_counter() - start
+            self._acquired += 1
+            if waited:
+                self._waits += 1
+                self._wait_time += elapsed
+                self._max_wait = max(self._max_wait, elapsed)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        # Never hand out a connection with a half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+            self.count('rollbacks')
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def count(self, name):
+        with self._cond:
+            self._counters[name] += 1
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                self._idle.pop().close()
+                self._created -= 1
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'max_size': self.max_size,
+                'size': self._created,
+                'idle': idle,
+                'in_use': self._created - idle,
+                'acquired': self._acquired,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'total_wait_ms': round(self._wait_time * 1000, 3),
+                'avg_wait_ms': round(self._wait_time * 1000 / self._waits, 3) if self._waits else 0.0,
+                'max_wait_ms': round(self._max_wait * 1000, 3),
+                **self._counters,
+            }
@@ -0,0 +1,86 @@
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+import requests
+
+# Runs blocking HTTP calls off the Tk main thread. Workers never touch
+# widgets; results are queued and handed to callbacks on the main thread
+# by a root.after() poll that only runs while calls are outstanding.
+
+POLL_INTERVAL_MS = 30
+
+
+def show_connection_error(e):
+    messagebox.showerror("Connection Error", f"Could not connect to server: {e}")
+
+
+def show_server_error(e):
+    messagebox.showerror("Error", f"Server error: {e}")
+
+
+class RequestDispatcher:
+    def __init__(self, root, workers=4, on_busy=None):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        self.results = queue.Queue()
+        self.on_busy = on_busy
+        self.pending = 0
+        self.visible = 0  # pending calls that show the busy indicator
+        self.polling = False
+        self.busy = False
+
+    def submit(self, call, on_done, on_error=show_connection_error, quiet=False):
+        """Runs call() on a worker thread, then on_done(result) on the Tk thread.
+
+        RequestException from call() goes to on_error(exc) instead; any other
+        exception is reported like an error in a Tk callback. Quiet calls, such
+        as background refreshes, do not show the busy indicator."""
+        self.pending += 1
+        if not quiet:
+            self.visible += 1
+            self._set_busy(True)
+        self.executor.submit(self._run, call, on_done, on_error, quiet)
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def _set_busy(self, busy):
+        if busy != self.busy:
+            self.busy = busy
+            if self.on_busy:
+                self.on_busy(busy)
+
+    def _run(self, call, on_done, on_error, quiet):
+        try:
+            self.results.put((on_done, call(), None, quiet))
+        except requests.exceptions.RequestException as e:
+            self.results.put((on_error, e, None, quiet))
+        except Exception:
+            self.results.put((None, None, sys.exc_info(), quiet))
+
+    def _poll(self):
+        while True:
+            try:
+                callback, value, exc_info, quiet = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if not quiet:
+                self.visible -= 1
+            try:
+                if exc_info:
+                    self.root.report_callback_exception(*exc_info)
+                elif callback:
+                    callback(value)
+            except Exception:
+                # e.g. the popup a result was meant for was closed meanwhile
+                self.root.report_callback_exception(*sys.exc_info())
+
+        self._set_busy(self.visible > 0)
+        self.polling = self.pending > 0
+        if self.polling:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
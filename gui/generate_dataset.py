@@ -0,0 +1,224 @@
+"""Builds a large, deterministic payroll_app.db for scale testing.
+
+Creates the schema with the same migrations the server runs, then
+bulk-loads employees, projects, daily deployments and the weekly
+PAYROLL / DEDUCTION / PAY_RECORD history that follows from them. The same
+--seed always produces the same database.
+
+    python generate_dataset.py --output payroll_large.db --employees 50000 \\
+        --projects 2000 --years 2
+
+50k employees over two years is ~25M DEPLOYMENT_LIST rows.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from werkzeug.security import generate_password_hash
+from migrations import migrate
+
+# Same pay rules as server.py
+REGULAR_HOURS = 8
+OVERTIME_RATE = 1.25
+
+# Weekly deductions as a share of gross pay
+DEDUCTION_RATES = (('SSS', 0.045), ('PhilHealth', 0.025), ('Pag-IBIG', 0.02))
+
+# PRAGMAs for a one-off bulk load; nothing else touches the file meanwhile
+BULK_LOAD_PRAGMAS = (
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA locking_mode=EXCLUSIVE",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-500000",
+)
+
+BATCH_ROWS = 200000
+
+FIRST_NAMES = ('Juan', 'Jose', 'Maria', 'Ana', 'Pedro', 'Mark', 'John', 'Rey', 'Joel', 'Ramon',
+               'Carlo', 'Paolo', 'Grace', 'Liza', 'Jun', 'Noel', 'Arnel', 'Dante', 'Rommel', 'Edwin')
+LAST_NAMES = ('Santos', 'Reyes', 'Cruz', 'Bautista', 'Ocampo', 'Garcia', 'Mendoza', 'Torres',
+              'Flores', 'Villanueva', 'Ramos', 'Castillo', 'Aquino', 'Rivera', 'Domingo', 'Navarro')
+DAILY_RATES = (570, 610, 645, 695, 750, 800, 900, 1000)
+
+# (time_out, attendance_hours) for an 08:00 start, weighted towards a regular day
+SHIFTS = (('16:00', 8.0),) * 6 + (('17:00', 9.0), ('18:00', 10.0), ('19:30', 11.5), ('12:00', 4.0))
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def workdays(start, end):
+    # Monday-Saturday, as (iso date, week index)
+    days = []
+    day = start
+    while day <= end:
+        if day.weekday() < 6:
+            days.append((day.isoformat(), (day - start).days // 7))
+        day += timedelta(days=1)
+    return days
+
+
+def generate_projects(rng, count, start, end):
+    span = (end - start).days
+    projects = []
+    for i in range(count):
+        project_start = start + timedelta(days=rng.randrange(-180, span))
+        project_end = project_start + timedelta(days=rng.randint(60, 900))
+        projects.append((f'Project {i + 1:05d}', project_start.isoformat(),
+                         project_end.isoformat(), rng.randint(50, 20000) * 1000))
+    return projects
+
+
+def employee_history(seed, employee_id, daily_rate, days, project_count):
+    """Returns one employee's daily deployments and the weekly payrolls they add up to."""
+    # Seed per employee so the output does not depend on batch boundaries
+    rng = random.Random(seed * 1000003 + employee_id)
+    hire_index = rng.randrange(len(days) // 3) if rng.random() < 0.4 else 0
+    project_id = rng.randint(1, project_count)
+    stint_left = rng.randint(20, 120)
+
+    deployments = []
+    weeks = {}
+    for day, week in days[hire_index:]:
+        if rng.random() < 0.08:  # absent
+            continue
+        if stint_left == 0:
+            project_id = rng.randint(1, project_count)
+            stint_left = rng.randint(20, 120)
+        stint_left -= 1
+
+        time_out, hours = SHIFTS[int(rng.random() * len(SHIFTS))]
+        overtime = max(0.0, hours - REGULAR_HOURS)
+        deployments.append((employee_id, project_id, '08:00', time_out, overtime, day, hours))
+
+        totals = weeks.setdefault(week, [0, 0.0])
+        totals[0] += 1
+        totals[1] += overtime
+
+    payrolls = []
+    for week, (days_worked, overtime) in sorted(weeks.items()):
+        gross = days_worked * daily_rate + overtime * (daily_rate / REGULAR_HOURS * OVERTIME_RATE)
+        deductions = [(name, round(gross * rate, 2)) for name, rate in DEDUCTION_RATES]
+        net = round(gross - sum(amount for _, amount in deductions), 2)
+        payrolls.append((round(gross, 2), net, week, deductions))
+    return deployments, payrolls
+
+
+def build(args):
+    if os.path.exists(args.output):
+        if not args.force:
+            raise SystemExit(f"{args.output} exists; pass --force to replace it")
+        os.remove(args.output)
+
+    started = time.perf_counter()
+    rng = random.Random(args.seed)
+    start = date.fromisoformat(args.start)
+    end = start + timedelta(days=round(365.25 * args.years) - 1)
+    days = workdays(start, end)
+    week_starts = {week: (start + timedelta(weeks=week)).isoformat() for _, week in days}
+    week_ends = {week: (start + timedelta(weeks=week, days=6)).isoformat() for _, week in days}
+
+    conn = sqlite3.connect(args.output, isolation_level=None)
+    migrate(conn)
+    for pragma in BULK_LOAD_PRAGMAS:
+        conn.execute(pragma)
+
+    # Loading into bare tables and rebuilding indexes and triggers afterwards
+    # is far cheaper than maintaining them row by row
+    deferred = [sql for (sql,) in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL")]
+    for kind, name in conn.execute(
+            "SELECT type, name FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL").fetchall():
+        conn.execute(f'DROP {kind.upper()} {name}')
+
+    conn.execute('BEGIN')
+    conn.execute('INSERT INTO USER (username, password_hash, role) VALUES (?, ?, ?)',
+                 ('admin', generate_password_hash('admin123'), 'super_admin'))
+
+    rates = [rng.choice(DAILY_RATES) for _ in range(args.employees)]
+    conn.executemany(
+        'INSERT INTO EMPLOYEE (employee_id, lastname, firstname, daily_rate) VALUES (?, ?, ?, ?)',
+        ((i + 1, rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES), rates[i])
+         for i in range(args.employees)))
+    conn.executemany(
+        'INSERT INTO PROJECT (project_id, project_name, project_start, project_end, budget) VALUES (?, ?, ?, ?, ?)',
+        ((i + 1, *project) for i, project in enumerate(generate_projects(rng, args.projects, start, end))))
+    conn.execute('COMMIT')
+    log(f"{args.employees} employees, {args.projects} projects")
+
+    counts = {'deployments': 0, 'payrolls': 0, 'deductions': 0}
+    payroll_id = 0
+    deployment_rows, payroll_rows, deduction_rows, pay_rows = [], [], [], []
+
+    def flush():
+        conn.execute('BEGIN')
+        conn.executemany('''
+            INSERT INTO DEPLOYMENT_LIST
+            (employee_id, project_id, time_in, time_out, overtime_hours, date, attendance_hours)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', deployment_rows)
+        conn.executemany('''
+            INSERT INTO PAYROLL (payroll_id, employee_id, gross_salary, net_salary, week_start, week_end)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', payroll_rows)
+        conn.executemany(
+            'INSERT INTO DEDUCTION (payroll_id, deduction_type, deduction_amount) VALUES (?, ?, ?)',
+            deduction_rows)
+        conn.executemany(
+            'INSERT INTO PAY_RECORD (employee_id, date_paid, amount, reference_number) VALUES (?, ?, ?, ?)',
+            pay_rows)
+        conn.execute('COMMIT')
+        counts['deployments'] += len(deployment_rows)
+        counts['payrolls'] += len(payroll_rows)
+        counts['deductions'] += len(deduction_rows)
+        for rows in (deployment_rows, payroll_rows, deduction_rows, pay_rows):
+            rows.clear()
+
+    for employee_id in range(1, args.employees + 1):
+        daily_rate = rates[employee_id - 1]
+        deployments, payrolls = employee_history(
+            args.seed, employee_id, daily_rate, days, args.projects)
+        deployment_rows.extend(deployments)
+        for gross, net, week, deductions in payrolls:
+            payroll_id += 1
+            week_end = week_ends[week]
+            payroll_rows.append((payroll_id, employee_id, gross, net, week_starts[week], week_end))
+            deduction_rows.extend((payroll_id, name, amount) for name, amount in deductions)
+            pay_rows.append((employee_id, week_end, net, 100000000 + payroll_id))
+
+        if len(deployment_rows) >= BATCH_ROWS:
+            flush()
+            log(f"  employee {employee_id}/{args.employees}: {counts['deployments']:,} deployments, "
+                f"{counts['payrolls']:,} payrolls ({time.perf_counter() - started:.0f}s)")
+    flush()
+
+    log("Rebuilding indexes and triggers")
+    for sql in deferred:
+        conn.execute(sql)
+    conn.execute('ANALYZE')
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.close()
+
+    log(f"Done in {time.perf_counter() - started:.0f}s: {counts['deployments']:,} deployments, "
+        f"{counts['payrolls']:,} payrolls, {counts['deductions']:,} deductions -> {args.output}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='payroll_large.db')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--employees', type=int, default=50000)
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--start', default='2023-01-02', help='first day of history (YYYY-MM-DD)')
+    parser.add_argument('--years', type=float, default=2.0)
+    parser.add_argument('--force', action='store_true', help='replace an existing output file')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    build(parse_args())
@@ -1,11 +1,11 @@
 from tkinter import *
 from tkinter import messagebox
 import requests
-from main_config import api_base_url
 
 class Login:
-    def __init__(self, root, on_login_success):
+    def __init__(self, root, api, on_login_success):
         self.root = root
+        self.api = api
         self.on_login_success = on_login_success
         self.root.title("Login")
         self.root.geometry("300x200")
@@ -33,8 +33,8 @@ class Login:
             return
 
         try:
-            response = requests.post(
-                f"{api_base_url}/login",
+            response = self.api.post(
+                "/login",
                 json={'username': username, 'password': password}
             )
             if response.status_code == 200:
@@ -1,15 +1,17 @@
 from tkinter import Tk
+from api_client import ApiClient
 from login import Login
 from app import App
 
 def start_app(token_data):
     login_root.destroy()
-    token = token_data['token']
+    api.set_token(token_data['token'])
     role = token_data.get('role', 'admin')
-    app = App(token, role)
+    app = App(api, role)
     app.root.mainloop()
 
 if __name__ == "__main__":
+    api = ApiClient()
     login_root = Tk()
-    Login(login_root, on_login_success=start_app)
+    Login(login_root, api, on_login_success=start_app)
     login_root.mainloop()
\ No newline at end of file
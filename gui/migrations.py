@@ -0,0 +1,249 @@
+import sqlite3
+
+# Ordered schema migrations. The applied version is stored in the database
+# header (PRAGMA user_version). Version 1 is the original init_db() script;
+# its IF NOT EXISTS clauses let databases created before migrations adopt it.
+
+# Tables whose writes bump DATA_VERSION; GET routes build their ETags from it
+VERSIONED_TABLES = ('EMPLOYEE', 'PROJECT', 'DEPLOYMENT_LIST', 'PAYROLL', 'DEDUCTION', 'PAY_RECORD')
+
+
+def data_version_script(tables=VERSIONED_TABLES):
+    # Triggers keep the counters right for every writer, including other processes
+    statements = ['''
+    CREATE TABLE IF NOT EXISTS DATA_VERSION (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    );''']
+    for table in tables:
+        statements.append(f"INSERT OR IGNORE INTO DATA_VERSION (table_name) VALUES ('{table}');")
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            statements.append(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_version_{event.lower()}
+    AFTER {event} ON {table}
+    BEGIN
+        UPDATE DATA_VERSION SET version = version + 1 WHERE table_name = '{table}';
+    END;''')
+    return '\n'.join(statements)
+
+
+# Tables whose row changes are recorded in CHANGE_LOG, with their key columns
+CHANGE_LOGGED_TABLES = {
+    'EMPLOYEE': ('employee_id',),
+    'PROJECT': ('project_id',),
+    'DEPLOYMENT_LIST': ('employee_id', 'project_id', 'date'),
+    'PAYROLL': ('payroll_id',),
+}
+
+
+def change_log_script(tables):
+    # Version 5 as released: EMPLOYEE and PROJECT only, keyed by row_id
+    # AUTOINCREMENT so a seq is never reused, even after old entries are deleted
+    statements = ['''
+    CREATE TABLE IF NOT EXISTS CHANGE_LOG (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT CHECK(op IN ('insert', 'update', 'delete')) NOT NULL
+    );''']
+    for table, key in tables.items():
+        for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            statements.append(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_change_{event.lower()}
+    AFTER {event} ON {table}
+    BEGIN
+        INSERT INTO CHANGE_LOG (table_name, row_id, op)
+        VALUES ('{table}', {row}.{key}, '{event.lower()}');
+    END;''')
+    return '\n'.join(statements)
+
+
+def keyed_change_log_script(tables):
+    # row_id is the rowid (the key itself for INTEGER PRIMARY KEY tables);
+    # row_key holds the key columns as JSON so composite keys survive deletes
+    statements = ['''
+    ALTER TABLE CHANGE_LOG ADD COLUMN row_key TEXT;''', '''
+    ALTER TABLE CHANGE_LOG ADD COLUMN changed_at INTEGER;''', '''
+    UPDATE CHANGE_LOG SET
+        row_key = json_object(CASE table_name WHEN 'EMPLOYEE' THEN 'employee_id' ELSE 'project_id' END, row_id),
+        changed_at = CAST(strftime('%s', 'now') AS INTEGER);''', '''
+    CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON CHANGE_LOG(changed_at);''']
+    for table, keys in tables.items():
+        for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            trigger = f'trg_{table.lower()}_change_{event.lower()}'
+            row_key = ', '.join(f"'{key}', {row}.{key}" for key in keys)
+            statements.append(f'''
+    DROP TRIGGER IF EXISTS {trigger};''')
+            statements.append(f'''
+    CREATE TRIGGER {trigger}
+    AFTER {event} ON {table}
+    BEGIN
+        INSERT INTO CHANGE_LOG (table_name, row_id, row_key, op, changed_at)
+        VALUES ('{table}', {row}.rowid, json_object({row_key}), '{event.lower()}',
+                CAST(strftime('%s', 'now') AS INTEGER));
+    END;''')
+    return '\n'.join(statements)
+
+
+MIGRATIONS = [
+    (1, 'Base schema', '''
+    CREATE TABLE IF NOT EXISTS USER (
+        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        role TEXT CHECK(role IN ('admin', 'super_admin')) NOT NULL
+    );
+              
+    CREATE TABLE IF NOT EXISTS EMPLOYEE (
+        employee_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        lastname TEXT NOT NULL,
+        firstname TEXT NOT NULL,
+        daily_rate REAL NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS PROJECT (
+        project_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_name TEXT NOT NULL,
+        project_start DATE NOT NULL,
+        project_end DATE,
+        budget REAL
+    );
+
+    CREATE TABLE IF NOT EXISTS DEPLOYMENT_LIST (
+        employee_id INTEGER NOT NULL,
+        project_id INTEGER NOT NULL,
+        time_in TIME NOT NULL,
+        time_out TIME NOT NULL,
+        overtime_hours REAL DEFAULT 0,
+        date DATE NOT NULL,
+        attendance_hours REAL,
+        PRIMARY KEY(employee_id, project_id, date),
+        FOREIGN KEY (employee_id) REFERENCES EMPLOYEE(employee_id),
+        FOREIGN KEY (project_id) REFERENCES PROJECT(project_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS DEDUCTION (
+        deduction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        payroll_id INTEGER NOT NULL,
+        deduction_type TEXT NOT NULL,
+        deduction_amount REAL NOT NULL,
+        FOREIGN KEY (payroll_id) REFERENCES PAYROLL(payroll_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS PAYROLL (
+        payroll_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER NOT NULL,
+        gross_salary REAL NOT NULL,
+        net_salary REAL NOT NULL,
+        week_start DATE NOT NULL,
+        week_end DATE NOT NULL,
+        FOREIGN KEY (employee_id) REFERENCES EMPLOYEE(employee_id)
+    );
+                
+    CREATE TABLE IF NOT EXISTS PAY_RECORD (
+        pay_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER NOT NULL,
+        date_paid DATE NOT NULL,
+        amount REAL NOT NULL,
+        reference_number INTEGER NOT NULL,
+        FOREIGN KEY (employee_id) REFERENCES EMPLOYEE(employee_id)
+    );
+    '''),
+
+    (2, 'Deployment range and pay record date indexes', '''
+    CREATE INDEX IF NOT EXISTS idx_deployment_employee_date
+        ON DEPLOYMENT_LIST(employee_id, date);
+
+    CREATE INDEX IF NOT EXISTS idx_deployment_date
+        ON DEPLOYMENT_LIST(date, employee_id, attendance_hours, overtime_hours);
+
+    CREATE INDEX IF NOT EXISTS idx_pay_record_date_paid
+        ON PAY_RECORD(date_paid);
+    '''),
+
+    (3, 'Per-table data versions', data_version_script()),
+
+    (4, 'Secondary indexes for foreign key lookups', '''
+    CREATE INDEX IF NOT EXISTS idx_deployment_project
+        ON DEPLOYMENT_LIST(project_id, date);
+
+    CREATE INDEX IF NOT EXISTS idx_payroll_employee_week
+        ON PAYROLL(employee_id, week_start, week_end);
+
+    CREATE INDEX IF NOT EXISTS idx_pay_record_employee_date
+        ON PAY_RECORD(employee_id, date_paid);
+
+    CREATE INDEX IF NOT EXISTS idx_deduction_payroll
+        ON DEDUCTION(payroll_id);
+    '''),
+
+    (5, 'Row change log', change_log_script({'EMPLOYEE': 'employee_id', 'PROJECT': 'project_id'})),
+
+    (6, 'Keyed change log for deployments and payroll', keyed_change_log_script(CHANGE_LOGGED_TABLES)),
+
+    # Covers the project cost report; its (project_id, date) prefix also
+    # serves everything idx_deployment_project did
+    (7, 'Covering index for project labor costs', '''
+    CREATE INDEX IF NOT EXISTS idx_deployment_project_cost
+        ON DEPLOYMENT_LIST(project_id, date, employee_id, attendance_hours, overtime_hours);
+
+    DROP INDEX IF EXISTS idx_deployment_project;
+    '''),
+
+    # Logouts are shared by every server process; rows are pruned once the
+    # token would have expired anyway
+    (8, 'Revoked tokens', '''
+    CREATE TABLE IF NOT EXISTS REVOKED_TOKEN (
+        jti TEXT PRIMARY KEY,
+        expires_at INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    '''),
+
+    # Lets each server process poll one counter instead of the whole list
+    (9, 'Revoked token version', data_version_script(('REVOKED_TOKEN',))),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def split_statements(script):
+    # executescript() would commit our transaction, so run statements one by one
+    statements = []
+    current = ''
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ''
+    if current.strip():
+        statements.append(current.strip())
+    return statements
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """Applies pending migrations in order and returns the versions applied."""
+    if schema_version(conn) >= LATEST_VERSION:
+        return []
+
+    applied = []
+    for version, _, script in MIGRATIONS:
+        # Each migration is one write transaction; re-check the version under the
+        # lock in case another server process migrated first
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            for statement in split_statements(script):
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
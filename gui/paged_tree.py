@@ -0,0 +1,119 @@
+from tkinter import ttk, messagebox
+from dispatcher import show_connection_error
+
+PAGE_SIZE = 200
+LOAD_MORE_AT = 0.9  # fraction of the loaded rows scrolled past before fetching the next page
+
+
+class PageCache:
+    """What a PagedTreeview has loaded: rows by key in list order, the next
+    page's cursor and the first page's ETag. An owner that keeps one across
+    views lets a reopened view show its rows at once and revalidate them."""
+
+    def __init__(self):
+        self.rows = {}
+        self.next_cursor = None
+        self.etag = None
+
+
+class PagedTreeview(ttk.Frame):
+    """Treeview over a keyset-paginated list endpoint (?limit=&after=).
+
+    Only the first page is fetched up front. The next page is requested when
+    the view is scrolled near the end of the loaded rows, or straight away if
+    the loaded rows do not fill the view yet. A reload revalidates the first
+    page with its ETag and keeps the loaded rows on 304.
+
+    Loaded rows are kept in self.rows by their key column, and put_row() /
+    remove_row() apply a single change without reloading. Passing a cache
+    shares that state with earlier and later views of the same list."""
+
+    def __init__(self, parent, api, dispatcher, path, columns, key, row_values,
+                 error_message="Failed to load records", page_size=PAGE_SIZE, cache=None):
+        super().__init__(parent)
+        self.api = api
+        self.dispatcher = dispatcher
+        self.path = path
+        self.key = key
+        self.row_values = row_values
+        self.error_message = error_message
+        self.page_size = page_size
+
+        self.cache = cache if cache is not None else PageCache()
+        self.rows = self.cache.rows
+        self.loading = False
+        self.generation = 0  # bumped on reload so late pages from before it are dropped
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        for iid, item in self.rows.items():
+            self.tree.insert("", "end", iid=iid, values=self.row_values(item))
+
+    def reload(self):
+        self.generation += 1
+        generation = self.generation
+        headers = {"If-None-Match": self.cache.etag} if self.cache.etag else {}
+        self.loading = True
+        self.dispatcher.submit(
+            lambda: self.api.get(self.path, params={"limit": self.page_size}, headers=headers),
+            lambda response: self.page_loaded(generation, response, first=True),
+            self.load_failed)
+
+    def load_more(self):
+        generation = self.generation
+        params = {"limit": self.page_size, "after": self.cache.next_cursor}
+        self.loading = True
+        self.dispatcher.submit(
+            lambda: self.api.get(self.path, params=params),
+            lambda response: self.page_loaded(generation, response),
+            self.load_failed)
+
+    def page_loaded(self, generation, response, first=False):
+        if generation != self.generation:
+            return
+        self.loading = False
+        if first and response.status_code == 304:
+            return  # Nothing changed; the rows already loaded are still current
+        if response.status_code != 200:
+            messagebox.showerror("Error", self.error_message)
+            return
+
+        page = response.json()
+        if first:
+            self.cache.etag = response.headers.get("ETag")
+            self.tree.delete(*self.tree.get_children())
+            self.rows.clear()
+        self.cache.next_cursor = page["next_cursor"]
+        for item in page["items"]:
+            self.put_row(item, append=True)
+
+    def put_row(self, item, append=False):
+        iid = str(item[self.key])
+        if self.tree.exists(iid):
+            self.tree.item(iid, values=self.row_values(item))
+        elif append or self.cache.next_cursor is None:
+            # Lists are in key order, so a new row belongs at the end; while
+            # more pages remain it will arrive with one of them instead
+            self.tree.insert("", "end", iid=iid, values=self.row_values(item))
+        else:
+            return
+        self.rows[iid] = item
+
+    def remove_row(self, key):
+        iid = str(key)
+        self.rows.pop(iid, None)
+        if self.tree.exists(iid):
+            self.tree.delete(iid)
+
+    def load_failed(self, e):
+        self.loading = False
+        show_connection_error(e)
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self.cache.next_cursor and not self.loading and float(last) >= LOAD_MORE_AT:
+            self.load_more()
@@ -0,0 +1,125 @@
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+# The pool is started from a request thread; forking a multithreaded
+# process can deadlock the child, so workers come from a fork server
+START_METHOD = 'forkserver'
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs werkzeug's password hashing in a process pool so request threads
+    only wait on it instead of burning CPU. At most max_pending hashes may be
+    queued or running; callers wait up to queue_timeout for a slot. A hash
+    that times out or a pool whose worker died raises HasherBusy, and a
+    broken pool is replaced on the next call."""
+
+    def __init__(self, workers=2, max_pending=16, queue_timeout=5.0, hash_timeout=30.0):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.hash_timeout = hash_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created lazily so forked server workers each start their own pool
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD))
+            return self._executor
+
+    def _discard_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HasherBusy("Password hashing queue is full")
+        try:
+            executor = self._get_executor()
+            return executor.submit(fn, *args).result(timeout=self.hash_timeout)
+        except FutureTimeout:
+            raise HasherBusy("Password hash timed out")
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise HasherBusy("Password hashing pool failed")
+        finally:
+            self._slots.release()
+
+    def generate(self, password):
+        return self._run(generate_password_hash, password)
+
+    def check(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+class LatencyRecorder:
+    """Keeps the most recent request durations for a single endpoint."""
+
+    def __init__(self, window=1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+
+    def record(self, seconds, ok=True):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            if not ok:
+                self.errors += 1
+
+    def timer(self):
+        return _Timer(self)
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            count, errors = self.count, self.errors
+        if not samples:
+            return {'count': count, 'errors': errors}
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+        return {
+            'count': count,
+            'errors': errors,
+            'avg_ms': round(sum(samples) / len(samples) * 1000, 3),
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(samples[-1] * 1000, 3),
+        }
+
+
+class _Timer:
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.record(time.perf_counter() - self.start, ok=exc_type is None)
+        return False
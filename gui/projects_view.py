@@ -2,19 +2,20 @@ from tkinter import *
 from tkinter import Frame
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
-from main_config import api_base_url
-import requests
+from dispatcher import show_server_error
 import datetime
 
 class ProjectManager(Frame):
-    def __init__(self, parent, api_url, token):
+    def __init__(self, parent, api, dispatcher):
         super().__init__(parent)
-        self.token = token
+        self.api = api
+        self.dispatcher = dispatcher
 
-        self.api_url = api_base_url
+        self.projects_etag = None
+        self.projects = {}  # project_id -> project, as last loaded or changed
 
+        # App loads the list (see App.load_all) and keeps it current
         self.init_ui()
-        self.load_projects()
 
 
     def init_ui(self):
@@ -36,20 +37,50 @@ class ProjectManager(Frame):
         Button(btn_frame, text="Manage Assignments", command=self.manage_assignments).grid(row=0, column=2, padx=5)
 
     def load_projects(self):
-        try:
-            response = requests.get(f"{self.api_url}/projects", headers={"Authorization": f"Bearer {self.token}"})
+        headers = {}
+        if self.projects_etag:
+            headers["If-None-Match"] = self.projects_etag
+
+        def loaded(response):
+            if response.status_code == 304:
+                return  # Nothing changed since the last load
             if response.status_code == 200:
+                self.projects_etag = response.headers.get("ETag")
                 self.tree.delete(*self.tree.get_children())
+                self.projects.clear()
                 for project in response.json():
-                    self.tree.insert("", "end", values=(project['project_id'],
-                                                        project['project_name'],
-                                                        project['project_start'],
-                                                        project['project_end'],
-                                                        f"₱{project['budget']:,.2f}"))
+                    self.put_project(project)
             else:
                 messagebox.showerror("Error", "Failed to load projects")
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Error", f"Could not connect to server: {e}")
+
+        self.dispatcher.submit(
+            lambda: self.api.get("/projects", headers=headers), loaded,
+            lambda e: messagebox.showerror("Error", f"Could not connect to server: {e}"))
+
+    def put_project(self, project):
+        iid = str(project['project_id'])
+        values = (project['project_id'],
+                  project['project_name'],
+                  project['project_start'],
+                  project['project_end'],
+                  f"₱{project['budget'] or 0:,.2f}")
+        self.projects[iid] = project
+        if self.tree.exists(iid):
+            self.tree.item(iid, values=values)
+        else:
+            self.tree.insert("", "end", iid=iid, values=values)
+
+    def remove_project(self, project_id):
+        iid = str(project_id)
+        self.projects.pop(iid, None)
+        if self.tree.exists(iid):
+            self.tree.delete(iid)
+
+    def apply_change(self, change):
+        if change['row'] is None:
+            self.remove_project(change['row_id'])
+        else:
+            self.put_project(change['row'])
 
 
     def add_project(self):
@@ -92,14 +123,20 @@ class ProjectManager(Frame):
                     "project_end": end_date.isoformat(),
                     "budget": float(budget)
                 }
-                response = requests.post(f"{self.api_url}/projects", json=project_data, headers={"Authorization": f"Bearer {self.token}"})
+            except ValueError:
+                messagebox.showerror("Error", "Budget must be a number")
+                return
+
+            def saved(response):
                 if response.status_code == 201:
-                    self.load_projects()
+                    self.put_project({"project_id": response.json()["project_id"], **project_data})
                     self.popup.destroy()
                 else:
                     messagebox.showerror("Error", "Failed to add project")
-            except requests.exceptions.RequestException as e:
-                messagebox.showerror("Error", f"Server error: {e}")
+
+            self.dispatcher.submit(
+                lambda: self.api.post("/projects", json=project_data),
+                saved, show_server_error)
 
         Button(self.popup, text="Save", command=save).pack(pady=10)
 
@@ -113,14 +150,15 @@ class ProjectManager(Frame):
         project_id, name, *_ = self.tree.item(selected[0], "values")
         confirm = messagebox.askyesno("Sure?", f"Delete project '{name}'?")
         if confirm:
-            try:
-                response = requests.delete(f"{self.api_url}/projects/{project_id}", headers={"Authorization": f"Bearer {self.token}"})
+            def deleted(response):
                 if response.status_code == 200:
-                    self.load_projects()
+                    self.remove_project(project_id)
                 else:
                     messagebox.showerror("Error", "Failed to delete project")
-            except requests.exceptions.RequestException as e:
-                messagebox.showerror("Error", f"Server error: {e}")
+
+            self.dispatcher.submit(
+                lambda: self.api.delete(f"/projects/{project_id}"),
+                deleted, show_server_error)
 
     def manage_assignments(self):
         selected = self.tree.selection()
@@ -140,8 +178,7 @@ class ProjectManager(Frame):
         control_frame.pack(pady=10)
         
         # Get all employees
-        try:
-            response = requests.get(f"{self.api_url}/employees", headers={"Authorization": f"Bearer {self.token}"})
+        def loaded(response):
             if response.status_code != 200:
                 messagebox.showerror("Error", "Failed to load employees")
                 return
@@ -197,13 +234,13 @@ class ProjectManager(Frame):
             self.assignments_tree.pack(fill="both", expand=True)
             
             self.load_project_assignments(project_id)
-            
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Error", f"Could not connect to server: {e}")
-        
+
+        self.dispatcher.submit(
+            lambda: self.api.get("/employees"),
+            loaded, lambda e: messagebox.showerror("Error", f"Could not connect to server: {e}"))
+
     def load_project_assignments(self, project_id):
-        try:
-            response = requests.get(f"{self.api_url}/deployments/project/{project_id}", headers={"Authorization": f"Bearer {self.token}"})
+        def loaded(response):
             if response.status_code == 200:
                 self.assignments_tree.delete(*self.assignments_tree.get_children())
                 for assignment in response.json():
@@ -215,8 +252,10 @@ class ProjectManager(Frame):
                         assignment['attendance_hours'],
                         assignment['overtime_hours']
                     ))
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Error", f"Could not load assignments: {e}")
+
+        self.dispatcher.submit(
+            lambda: self.api.get(f"/deployments/project/{project_id}"),
+            loaded, lambda e: messagebox.showerror("Error", f"Could not load assignments: {e}"))
 
     def assign_employee(self, project_id):
         employee_str = self.employee_var.get()
@@ -229,19 +268,19 @@ class ProjectManager(Frame):
         time_in = self.time_in_entry.get()
         time_out = self.time_out_entry.get()
         
-        try:
-            response = requests.post(f"{self.api_url}/deployments", json={
-                "employee_id": employee_id,
-                "project_id": project_id,
-                "time_in": time_in,
-                "time_out": time_out,
-                "date": date
-            }, headers={"Authorization": f"Bearer {self.token}"})
-            
+        def assigned(response):
             if response.status_code == 201:
                 messagebox.showinfo("Success", "Employee assigned successfully")
                 self.load_project_assignments(project_id)
             else:
                 messagebox.showerror("Error", "Failed to assign employee")
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Error", f"Could not connect to server: {e}")
\ No newline at end of file
+
+        self.dispatcher.submit(
+            lambda: self.api.post("/deployments", json={
+                "employee_id": employee_id,
+                "project_id": project_id,
+                "time_in": time_in,
+                "time_out": time_out,
+                "date": date
+            }),
+            assigned, lambda e: messagebox.showerror("Error", f"Could not connect to server: {e}"))
\ No newline at end of file
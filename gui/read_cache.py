@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class ReadCache:
+    """Read-through LRU cache with TTL. Keys are tuples whose first item names
+    the resource ('employees', 'projects', ...) so writes can drop everything
+    cached for that resource at once."""
+
+    def __init__(self, max_size=256, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+
+    def get_or_load(self, key, load):
+        resource = key[0]
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] > now:
+                self._entries.move_to_end(key)
+                self._hits[resource] = self._hits.get(resource, 0) + 1
+                return entry[0]
+            self._misses[resource] = self._misses.get(resource, 0) + 1
+            generation = self._generations.get(resource, 0)
+
+        value = load()
+        if value is None:
+            return None
+
+        with self._lock:
+            # Skip the store if a write invalidated the resource while we loaded
+            if self._generations.get(resource, 0) == generation:
+                self._entries[key] = (value, time.time() + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, resource):
+        with self._lock:
+            self._generations[resource] = self._generations.get(resource, 0) + 1
+            for key in [key for key in self._entries if key[0] == resource]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            for resource in {key[0] for key in self._entries}:
+                self._generations[resource] = self._generations.get(resource, 0) + 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            resources = set(self._hits) | set(self._misses)
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'resources': {
+                    resource: {
+                        'hits': self._hits.get(resource, 0),
+                        'misses': self._misses.get(resource, 0),
+                    } for resource in sorted(resources)
+                },
+            }
@@ -0,0 +1,266 @@
+"""Production launcher for the payroll API (Linux).
+
+The master process binds the listening socket, runs schema migrations once
+and then forks N worker processes that share the socket and the WAL-mode
+SQLite file. Each worker serves requests from a fixed-size thread pool.
+
+    python serve.py --workers 4 --threads 8 --max-requests 5000
+
+Signals to the master:
+    SIGHUP           graceful reload: start fresh workers, then drain the old ones
+    SIGTERM/SIGINT   graceful shutdown
+    SIGTTIN/SIGTTOU  add / remove one worker
+
+Per-process state is not shared between workers: /api/_metrics and the
+/api/_pool, /api/_tokens and read cache stats describe the worker that
+answered. Token revocations and data versions live in the database.
+"""
+import argparse
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+KEEPALIVE_TIMEOUT = 5  # seconds an idle keep-alive connection may hold a thread
+ACCEPT_POLL = 0.5  # seconds between checks for a free thread while all are busy
+
+
+def log(message):
+    print(f"[{os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+class RequestHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+
+    def log_request(self, *args, **kwargs):
+        pass  # Access logging costs more than it is worth at volume
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        if self.server.request_done():
+            self.close_connection = True
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """WSGI server that hands each accepted connection to a bounded thread
+    pool and stops accepting once max_requests requests have been served.
+
+    A connection is only accepted when a thread is free to take it; until
+    then it waits in the shared listen backlog, where another worker can
+    pick it up."""
+
+    multithread = True
+
+    def __init__(self, host, port, app, fd, threads, max_requests):
+        super().__init__(host, port, app, handler=RequestHandler, fd=fd)
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.free_threads = threading.BoundedSemaphore(threads)
+        self.max_requests = max_requests
+        self.handled = 0
+        self.stopping = False
+        self._lock = threading.Lock()
+
+    def get_request(self):
+        # An OSError here makes serve_forever skip this round and poll again
+        if not self.free_threads.acquire(timeout=ACCEPT_POLL):
+            raise OSError("no free request thread")
+        try:
+            return super().get_request()
+        except BaseException:
+            self.free_threads.release()
+            raise
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def request_done(self):
+        # Returns True once the worker should stop taking requests
+        with self._lock:
+            self.handled += 1
+            if self.max_requests and self.handled >= self.max_requests:
+                self.stop()
+        return self.stopping
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.free_threads.release()
+
+    def stop(self):
+        # shutdown() blocks until serve_forever returns, so it needs its own thread
+        if not self.stopping:
+            self.stopping = True
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+
+def run_worker(args, fd):
+    for sig in (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+        signal.signal(sig, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the master turns Ctrl+C into SIGTERM
+
+    # The app is imported after the fork so a reload picks up new code
+    import server as api
+
+    # Jitter keeps workers from all recycling at the same moment
+    max_requests = args.max_requests
+    if max_requests and args.max_requests_jitter:
+        max_requests += random.randint(0, args.max_requests_jitter)
+
+    httpd = PooledWSGIServer(args.host, args.port, api.app, fd, args.threads, max_requests)
+    signal.signal(signal.SIGTERM, lambda *_: httpd.stop())
+    log(f"worker serving with {args.threads} threads")
+    try:
+        httpd.serve_forever(poll_interval=0.5)
+    finally:
+        httpd.executor.shutdown(wait=True)  # finish in-flight requests
+        api.password_hasher.shutdown()
+        api.db_pool.close_all()
+    if max_requests and httpd.handled >= max_requests:
+        log(f"worker recycling after {httpd.handled} requests")
+
+
+def run_setup():
+    import server as api
+    api.init_db()
+    api.seed_default_users()
+    api.password_hasher.shutdown()
+
+
+class Master:
+    def __init__(self, args):
+        self.args = args
+        self.workers = {}  # pid -> generation
+        self.generation = 0
+        self.target = args.workers
+        self.stopping = False
+        self.reload_requested = False
+
+    def bind(self):
+        self.sock = socket.create_server((self.args.host, self.args.port), reuse_port=False, backlog=2048)
+        self.sock.set_inheritable(True)
+
+    def fork(self, target):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                target()
+            except Exception as e:
+                log(f"worker failed: {e!r}")
+                code = 1
+            finally:
+                os._exit(code)
+        return pid
+
+    def setup_database(self):
+        # Migrations run once, in a throwaway child, so the master never imports the app
+        pid = self.fork(run_setup)
+        _, status = os.waitpid(pid, 0)
+        if os.waitstatus_to_exitcode(status) != 0:
+            raise SystemExit("Database setup failed")
+
+    def spawn(self):
+        pid = self.fork(lambda: run_worker(self.args, self.sock.fileno()))
+        self.workers[pid] = self.generation
+
+    def signal_workers(self, sig, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def reap(self):
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.workers.pop(pid, None)
+
+    def reload(self):
+        self.reload_requested = False
+        log("reloading workers")
+        old = list(self.workers)
+        self.generation += 1
+        for _ in range(self.target):
+            self.spawn()
+        self.signal_workers(signal.SIGTERM, old)
+
+    def install_signals(self):
+        def stop(*_):
+            self.stopping = True
+
+        def reload(*_):
+            self.reload_requested = True
+
+        def more(*_):
+            self.target += 1
+
+        def fewer(*_):
+            self.target = max(1, self.target - 1)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGHUP, reload)
+        signal.signal(signal.SIGTTIN, more)
+        signal.signal(signal.SIGTTOU, fewer)
+
+    def run(self):
+        self.bind()
+        self.setup_database()
+        self.install_signals()
+        log(f"listening on {self.args.host}:{self.args.port} with {self.target} workers")
+
+        while not self.stopping:
+            self.reap()
+            if self.reload_requested:
+                self.reload()
+            current = [pid for pid, gen in self.workers.items() if gen == self.generation]
+            for _ in range(self.target - len(current)):
+                self.spawn()
+            if len(current) > self.target:
+                self.signal_workers(signal.SIGTERM, current[self.target:])
+            time.sleep(0.2)
+
+        self.shutdown()
+
+    def shutdown(self):
+        log("shutting down")
+        self.signal_workers(signal.SIGTERM, list(self.workers))
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        self.signal_workers(signal.SIGKILL, list(self.workers))
+        self.sock.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--threads', type=int, default=8, help='request threads per worker')
+    parser.add_argument('--max-requests', type=int, default=0,
+                        help='recycle a worker after this many requests (0 = never)')
+    parser.add_argument('--max-requests-jitter', type=int, default=0)
+    parser.add_argument('--graceful-timeout', type=float, default=30.0,
+                        help='seconds to let workers drain on shutdown')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    Master(parse_args()).run()
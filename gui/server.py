@@ -1,95 +1,137 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, has_app_context, has_request_context, make_response, stream_with_context
 from flask_cors import CORS
 import sqlite3
 import os
+import io
+import csv
+import json
+import math
+import zlib
+import time
+import uuid
 from datetime import datetime
 import jwt
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
 from functools import wraps
+from db_pool import ConnectionPool
+from token_cache import TokenCache, RevocationList
+from password_hasher import PasswordHasher, HasherBusy, LatencyRecorder
+from read_cache import ReadCache
+from migrations import migrate, CHANGE_LOGGED_TABLES
+from sql_profiler import SQLProfiler
+from metrics import Registry
 
 app = Flask(__name__)
 CORS(app)
 
 # Database configuration
-DB_PATH = os.path.abspath("payroll_app.db")
+DB_PATH = os.path.abspath(os.environ.get("PAYROLL_DB_PATH", "payroll_app.db"))
+DB_POOL_SIZE = 8
+DB_POOL_TIMEOUT = 10.0  # seconds to wait for a free connection
+
+db_pool = ConnectionPool(DB_PATH, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT)
+
+# Per-endpoint statement timings; statements slower than the threshold are
+# logged with their query plan
+SQL_PROFILING = True
+SLOW_QUERY_THRESHOLD = 0.1  # seconds
+FULL_SCAN_TABLES = ('DEPLOYMENT_LIST', 'PAY_RECORD')  # tables large enough that a scan is worth flagging
+
+sql_profiler = SQLProfiler(slow_threshold=SLOW_QUERY_THRESHOLD, full_scan_tables=FULL_SCAN_TABLES)
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = db_pool.acquire()
+    if SQL_PROFILING:
+        conn = sql_profiler.wrap(conn, request.endpoint if has_request_context() else None)
+    if has_app_context():
+        # Remember it so teardown can hand it back if a route forgets to close
+        g.setdefault('db_conns', []).append(conn)
     return conn
 
+@app.teardown_appcontext
+def release_db_connections(exc):
+    for conn in g.pop('db_conns', []):
+        conn.close()
+
+# Request metrics, served in Prometheus text format at /api/_metrics. Each
+# process counts its own requests, so under serve.py a scrape shows only the
+# worker that answered it; the worker label keeps those series apart
+metrics = Registry(const_labels=[('worker', os.getpid())])
+http_requests = metrics.counter(
+    'payroll_http_requests_total', 'Requests handled, by route, method and status.',
+    ('route', 'method', 'status'))
+http_latency = metrics.histogram(
+    'payroll_http_request_duration_seconds', 'Time to build the response, by route.',
+    ('route', 'method'))
+http_in_flight = metrics.gauge(
+    'payroll_http_requests_in_flight', 'Requests currently being handled, by route.',
+    ('route', 'method'))
+db_events = metrics.counter(
+    'payroll_db_events_total', 'SQLite commits, rollbacks, statements that hit a locked database and commit retries.', ('event',))
+db_pool_connections = metrics.gauge(
+    'payroll_db_pool_connections', 'Pooled SQLite connections by state.', ('state',))
+db_pool_waits = metrics.counter(
+    'payroll_db_pool_waits_total', 'Connection acquisitions that had to wait.')
+
+@metrics.on_collect
+def collect_db_metrics():
+    stats = db_pool.stats()
+    for event in ('commits', 'rollbacks', 'busy_errors', 'busy_retries'):
+        db_events.set(event, value=stats[event])
+    db_pool_connections.set('idle', value=stats['idle'])
+    db_pool_connections.set('in_use', value=stats['in_use'])
+    db_pool_waits.set(value=stats['waits'])
+
+def route_labels():
+    rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+    return rule, request.method
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.metric_labels = route_labels()
+    http_in_flight.inc(*g.metric_labels)
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_start' in g:
+        http_latency.observe(*g.metric_labels, value=time.perf_counter() - g.request_start)
+        http_requests.inc(*g.metric_labels, str(response.status_code))
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    labels = g.pop('metric_labels', None)
+    if labels:
+        http_in_flight.dec(*labels)
+
 def init_db():
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.executescript('''
-    CREATE TABLE IF NOT EXISTS USER (
-        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password_hash TEXT NOT NULL,
-        role TEXT CHECK(role IN ('admin', 'super_admin')) NOT NULL
-    );
-              
-    CREATE TABLE IF NOT EXISTS EMPLOYEE (
-        employee_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        lastname TEXT NOT NULL,
-        firstname TEXT NOT NULL,
-        daily_rate REAL NOT NULL
-    );
-
-    CREATE TABLE IF NOT EXISTS PROJECT (
-        project_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        project_name TEXT NOT NULL,
-        project_start DATE NOT NULL,
-        project_end DATE,
-        budget REAL
-    );
-
-    CREATE TABLE IF NOT EXISTS DEPLOYMENT_LIST (
-        employee_id INTEGER NOT NULL,
-        project_id INTEGER NOT NULL,
-        time_in TIME NOT NULL,
-        time_out TIME NOT NULL,
-        overtime_hours REAL DEFAULT 0,
-        date DATE NOT NULL,
-        attendance_hours REAL,
-        PRIMARY KEY(employee_id, project_id, date),
-        FOREIGN KEY (employee_id) REFERENCES EMPLOYEE(employee_id),
-        FOREIGN KEY (project_id) REFERENCES PROJECT(project_id)
-    );
-
-    CREATE TABLE IF NOT EXISTS DEDUCTION (
-        deduction_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        payroll_id INTEGER NOT NULL,
-        deduction_type TEXT NOT NULL,
-        deduction_amount REAL NOT NULL,
-        FOREIGN KEY (payroll_id) REFERENCES PAYROLL(payroll_id)
-    );
-
-    CREATE TABLE IF NOT EXISTS PAYROLL (
-        payroll_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        employee_id INTEGER NOT NULL,
-        gross_salary REAL NOT NULL,
-        net_salary REAL NOT NULL,
-        week_start DATE NOT NULL,
-        week_end DATE NOT NULL,
-        FOREIGN KEY (employee_id) REFERENCES EMPLOYEE(employee_id)
-    );
-                
-    CREATE TABLE IF NOT EXISTS PAY_RECORD (
-        pay_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        employee_id INTEGER NOT NULL,
-        date_paid DATE NOT NULL,
-        amount REAL NOT NULL,
-        reference_number INTEGER NOT NULL,
-        FOREIGN KEY (employee_id) REFERENCES EMPLOYEE(employee_id)
-    );
-    ''')
-
-    conn.commit()
-    conn.close()
+    try:
+        applied = migrate(conn)
+        if applied:
+            app.logger.info("Applied schema migrations %s", applied)
+    finally:
+        conn.close()
 
 SECRET_KEY = "your-secret-key"  # Store securely in production
+TOKEN_LIFETIME = 12 * 60 * 60  # seconds; covers a full shift
+TOKEN_CACHE_SIZE = 1024
+TOKEN_CACHE_TTL = 300  # seconds a verified token skips signature checks
+
+REVOCATION_REFRESH_INTERVAL = 1.0  # seconds before a logout on another worker is seen
+
+token_cache = TokenCache(max_size=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+revoked_tokens = RevocationList(refresh_interval=REVOCATION_REFRESH_INTERVAL)
+
+# Password hashing runs in worker processes, away from the request threads
+HASH_WORKERS = 2
+HASH_MAX_PENDING = 16  # hashes queued or running before callers start waiting
+HASH_QUEUE_TIMEOUT = 5.0  # seconds to wait for a slot before answering 503
+
+password_hasher = PasswordHasher(workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING,
+                                 queue_timeout=HASH_QUEUE_TIMEOUT)
+login_latency = LatencyRecorder()
 
 def seed_default_users():
     conn = get_db_connection()
@@ -109,6 +151,10 @@ def seed_default_users():
 
 @app.route('/api/login', methods=['POST'])
 def login():
+    with login_latency.timer():
+        return authenticate()
+
+def authenticate():
     data = request.json
     username = data.get('username')
     password = data.get('password')
@@ -117,16 +163,40 @@ def login():
     user = conn.execute('SELECT * FROM USER WHERE username = ?', (username,)).fetchone()
     conn.close()
 
-    if user and check_password_hash(user['password_hash'], password):
+    try:
+        valid = bool(user and password) and password_hasher.check(user['password_hash'], password)
+    except HasherBusy:
+        return jsonify({'error': 'Server busy, try again'}), 503
+
+    if valid:
+        now = int(time.time())
         token = jwt.encode({
             'user_id': user['user_id'],
             'username': user['username'],
-            'role': user['role']
+            'role': user['role'],
+            'jti': uuid.uuid4().hex,
+            'iat': now,
+            'exp': now + TOKEN_LIFETIME
         }, SECRET_KEY, algorithm='HS256')
-        return jsonify({'token': token})
+        return jsonify({'token': token, 'expires_in': TOKEN_LIFETIME})
     
     return jsonify({'error': 'Invalid credentials'}), 401
 
+def refresh_revoked_tokens():
+    # Logouts are shared through REVOKED_TOKEN. Each process checks its version
+    # once per interval and reloads the list only after a logout somewhere.
+    if not revoked_tokens.due():
+        return
+    conn = get_db_connection()
+    try:
+        version = conn.execute(
+            "SELECT version FROM data_version WHERE table_name = 'REVOKED_TOKEN'").fetchone()[0]
+        if version != revoked_tokens.version:
+            revoked = conn.execute('SELECT jti, expires_at FROM revoked_token').fetchall()
+            revoked_tokens.replace(revoked, version)
+    finally:
+        conn.close()
+
 def authorize(allowed_roles):
     def wrapper(f):
         @wraps(f)
@@ -136,20 +206,43 @@ def authorize(allowed_roles):
                 return jsonify({'error': 'Unauthorized'}), 401
             
             token = auth_header.split()[1]
-            try:
-                decoded = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-                if decoded['role'] not in allowed_roles:
-                    return jsonify({'error': 'Forbidden'}), 403
-                request.user = decoded
-            except jwt.ExpiredSignatureError:
-                return jsonify({'error': 'Token expired'}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({'error': 'Invalid token'}), 401
+            decoded = token_cache.get(token)
+            if decoded is None:
+                try:
+                    decoded = jwt.decode(token, SECRET_KEY, algorithms=['HS256'],
+                                         options={'require': ['exp', 'jti']})
+                except jwt.ExpiredSignatureError:
+                    return jsonify({'error': 'Token expired'}), 401
+                except jwt.InvalidTokenError:
+                    return jsonify({'error': 'Invalid token'}), 401
+                token_cache.put(token, decoded)
+
+            refresh_revoked_tokens()
+            if decoded['jti'] in revoked_tokens:
+                return jsonify({'error': 'Token revoked'}), 401
+            if decoded['role'] not in allowed_roles:
+                return jsonify({'error': 'Forbidden'}), 403
+            request.user = decoded
 
             return f(*args, **kwargs)
         return decorated
     return wrapper
 
+@app.route('/api/logout', methods=['POST'])
+@authorize(['super_admin', 'admin'])
+def logout():
+    conn = get_db_connection()
+    try:
+        conn.execute('DELETE FROM revoked_token WHERE expires_at <= ?', (int(time.time()),))
+        conn.execute('INSERT OR IGNORE INTO revoked_token (jti, expires_at) VALUES (?, ?)',
+                     (request.user['jti'], request.user['exp']))
+        conn.commit()
+    finally:
+        conn.close()
+    revoked_tokens.revoke(request.user['jti'], request.user['exp'])
+    token_cache.discard(request.headers['Authorization'].split()[1])
+    return jsonify({'status': 'logged out'}), 200
+
 @app.route('/api/users', methods=['POST'])
 @authorize(['super_admin'])
 def create_user():
@@ -161,7 +254,10 @@ def create_user():
     if not username or not password or role not in ['admin', 'super_admin']:
         return jsonify({'error': 'Invalid input'}), 400
 
-    password_hash = generate_password_hash(password)
+    try:
+        password_hash = password_hasher.generate(password)
+    except HasherBusy:
+        return jsonify({'error': 'Server busy, try again'}), 503
 
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -177,6 +273,10 @@ def create_user():
     finally:
         conn.close()
 
+# Pay rules shared by the deployment and payroll endpoints
+REGULAR_HOURS = 8
+OVERTIME_RATE = 1.25
+
 # Helper function to compute attendance hours
 def compute_attendance_hours(time_in_str, time_out_str):
     time_format = "%H:%M"
@@ -190,16 +290,178 @@ def compute_attendance_hours(time_in_str, time_out_str):
                     datetime.combine(datetime.today(), time_in)).total_seconds()
     return total_seconds / 3600
 
+def parse_clock_minutes(value):
+    # Cheap "HH:MM" -> minutes since midnight, used by the batch path instead of strptime
+    hours, minutes = value.split(':')
+    total = int(hours) * 60 + int(minutes)
+    if len(minutes) != 2 or not 0 <= int(minutes) < 60 or not 0 <= total < 24 * 60:
+        raise ValueError(f"Invalid time '{value}', expected HH:MM")
+    return total
+
+def insert_many_returning_ids(conn, table, id_column, sql, rows):
+    # executemany() has no per-row lastrowid. Caller must hold the write lock
+    # (BEGIN IMMEDIATE); AUTOINCREMENT ids then follow the current max in order.
+    last_id = conn.execute(f'SELECT COALESCE(MAX({id_column}), 0) FROM {table}').fetchone()[0]
+    conn.executemany(sql, rows)
+    return [row[0] for row in conn.execute(
+        f'SELECT {id_column} FROM {table} WHERE {id_column} > ? ORDER BY {id_column}', (last_id,)
+    )]
+
+def conditional(*tables):
+    # Tags GET responses with the data versions of the tables they read and
+    # answers 304 when the client's If-None-Match is still current
+    def wrapper(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            conn = get_db_connection()
+            try:
+                versions = dict(conn.execute(
+                    f"SELECT table_name, version FROM DATA_VERSION "
+                    f"WHERE table_name IN ({', '.join('?' * len(tables))})", tables
+                ).fetchall())
+            finally:
+                conn.close()
+            etag = '.'.join(f"{table.lower()}{versions.get(table, 0)}" for table in tables)
+            # Read-cache keys carry the same versions, so a write from any
+            # process makes every process miss instead of serving old rows
+            g.data_version = etag
+
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return decorated
+    return wrapper
+
+# Keyset pagination: ?limit=N&after=<cursor>. Without either param the
+# list endpoints keep returning the full list as before.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def get_page_args():
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    if limit is None and after is None:
+        return None, None
+    limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE), after
+
+def page_payload(rows, limit, cursor_of):
+    # Callers fetch limit + 1 rows; the extra one tells us there is a next page
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = cursor_of(items[-1]) if len(rows) > limit else None
+    return {'items': items, 'next_cursor': next_cursor}
+
+def page_response(rows, limit, cursor_of):
+    return jsonify(page_payload(rows, limit, cursor_of))
+
+# Read-through cache for employee and project reads. Keys include the data
+# versions conditional() read, so a write from any process is seen at once;
+# local writes also drop the old entries, and the TTL ages out the rest.
+READ_CACHE_SIZE = 256
+READ_CACHE_TTL = 60  # seconds
+
+read_cache = ReadCache(max_size=READ_CACHE_SIZE, ttl=READ_CACHE_TTL)
+
+# NDJSON streaming, opted into with ?stream=1 or Accept: application/x-ndjson
+STREAM_BATCH_SIZE = 500
+
+def wants_stream():
+    return (request.args.get('stream') == '1'
+            or 'application/x-ndjson' in request.headers.get('Accept', ''))
+
+def stream_rows(conn, cursor):
+    # Rows are pulled from sqlite in batches and written out one JSON object
+    # per line, so memory stays flat however many rows match
+    def generate():
+        try:
+            while True:
+                rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                yield ''.join(json.dumps(dict(row)) + '\n' for row in rows)
+        finally:
+            conn.close()
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Response compression, negotiated from Accept-Encoding
+COMPRESS_MIN_SIZE = 1024  # bytes; smaller bodies are not worth the CPU
+COMPRESS_LEVEL = 6
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson')
+COMPRESS_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+def compress_chunks(chunks, compressor):
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    encoding = next((e for e in ('gzip', 'deflate') if request.accept_encodings[e]), None)
+    if encoding is None:
+        return response
+
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, COMPRESS_WBITS[encoding])
+    if response.is_streamed:
+        response.response = compress_chunks(response.response, compressor)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(compressor.compress(body) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # The compressed bytes differ from the identity body, so the tag becomes weak
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
 # EMPLOYEE ENDPOINTS
 @app.route('/api/employees', methods=['GET'])
 @authorize(['super_admin', 'admin'])
+@conditional('EMPLOYEE')
 def get_employee():
-    conn = get_db_connection()
     try:
-        employees = conn.execute('SELECT * FROM employee').fetchall()
-        return jsonify([dict(row) for row in employees])
-    finally:
-        conn.close()
+        limit, after = get_page_args()
+        after = int(after) if after else 0
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
+
+    def load():
+        conn = get_db_connection()
+        try:
+            if limit is None:
+                employees = conn.execute('SELECT * FROM employee').fetchall()
+                return [dict(row) for row in employees]
+
+            employees = conn.execute(
+                'SELECT * FROM employee WHERE employee_id > ? ORDER BY employee_id LIMIT ?',
+                (after, limit + 1)
+            ).fetchall()
+            return page_payload(employees, limit, lambda row: str(row['employee_id']))
+        finally:
+            conn.close()
+
+    return jsonify(read_cache.get_or_load(('employees', 'list', g.data_version, limit, after), load))
 
 @app.route('/api/employees', methods=['POST'])
 @authorize(['super_admin', 'admin'])
@@ -213,6 +475,7 @@ def add_employee():
             (data['lastname'], data['firstname'], data['daily_rate'])
         )
         conn.commit()
+        read_cache.invalidate('employees')
         return jsonify({
             'id': cursor.lastrowid,
             'lastname': data['lastname'],
@@ -222,6 +485,78 @@ def add_employee():
     finally:
         conn.close()
 
+def parse_employee_row(row):
+    lastname = row.get('lastname') or ''
+    firstname = row.get('firstname') or ''
+    if not isinstance(lastname, str) or not isinstance(firstname, str):
+        raise ValueError("firstname and lastname must be text")
+    lastname, firstname = lastname.strip(), firstname.strip()
+    if not lastname or not firstname:
+        raise ValueError("firstname and lastname are required")
+    try:
+        daily_rate = float(row.get('daily_rate'))
+    except (TypeError, ValueError):
+        raise ValueError("daily_rate must be a number")
+    # SQLite stores NaN as NULL, which would fail the whole batch on NOT NULL
+    if not math.isfinite(daily_rate):
+        raise ValueError("daily_rate must be a finite number")
+    if daily_rate < 0:
+        raise ValueError("daily_rate must not be negative")
+    return lastname, firstname, daily_rate
+
+@app.route('/api/employees/bulk', methods=['POST'])
+@authorize(['super_admin', 'admin'])
+def add_employees_bulk():
+    # Accepts a JSON array, a CSV body (text/csv) or a CSV file upload named "file".
+    # CSV input needs a header row with lastname, firstname and daily_rate.
+    if 'file' in request.files or request.mimetype == 'text/csv':
+        data = request.files['file'].read() if 'file' in request.files else request.get_data()
+        try:
+            text = data.decode('utf-8-sig')
+        except UnicodeDecodeError as e:
+            # Spreadsheet exports are often Windows-1252; name the byte so the row can be found
+            return jsonify({'error': f'CSV must be UTF-8 encoded (invalid byte at offset {e.start}); '
+                                     'save it as "CSV UTF-8" and upload again'}), 400
+        rows = list(csv.DictReader(io.StringIO(text)))
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({'error': 'Expected a JSON array or CSV data'}), 400
+
+    valid = []
+    errors = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'row': index, 'error': 'Row must be an object'})
+            continue
+        try:
+            valid.append((index, parse_employee_row(row)))
+        except ValueError as e:
+            errors.append({'row': index, 'error': str(e)})
+
+    if not valid:
+        return jsonify({'created': [], 'errors': errors}), 400
+
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        employee_ids = insert_many_returning_ids(
+            conn, 'employee', 'employee_id',
+            'INSERT INTO employee (lastname, firstname, daily_rate) VALUES (?, ?, ?)',
+            [values for _, values in valid]
+        )
+        conn.commit()
+        read_cache.invalidate('employees')
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
+
+    created = [{'row': index, 'employee_id': employee_id}
+               for (index, _), employee_id in zip(valid, employee_ids)]
+    return jsonify({'created': created, 'errors': errors}), 201
+
 @app.route('/api/employees/<int:employee_id>', methods=['DELETE'])
 @authorize(['super_admin'])
 def delete_employee(employee_id):
@@ -230,6 +565,7 @@ def delete_employee(employee_id):
     
     cursor.execute("DELETE FROM employee WHERE employee_id = ?", (employee_id,))
     conn.commit()
+    read_cache.invalidate('employees')
     affected_rows = cursor.rowcount
     conn.close()
     
@@ -240,13 +576,17 @@ def delete_employee(employee_id):
 
 @app.route('/api/employees/<int:employee_id>', methods=['GET'])
 @authorize(['super_admin', 'admin'])
+@conditional('EMPLOYEE')
 def get_single_employee(employee_id):
-    conn = get_db_connection()
-    employee = conn.execute('SELECT * FROM employee WHERE employee_id = ?', (employee_id,)).fetchone()
-    conn.close()
+    def load():
+        conn = get_db_connection()
+        employee = conn.execute('SELECT * FROM employee WHERE employee_id = ?', (employee_id,)).fetchone()
+        conn.close()
+        return dict(employee) if employee else None
 
+    employee = read_cache.get_or_load(('employees', 'id', g.data_version, employee_id), load)
     if employee:
-        return jsonify(dict(employee)), 200
+        return jsonify(employee), 200
     else:
         return jsonify({'error': 'Employee not found'}), 404
 
@@ -270,6 +610,7 @@ def update_employee(employee_id):
         WHERE employee_id = ?
     ''', (firstname, lastname, daily_rate, employee_id))
     conn.commit()
+    read_cache.invalidate('employees')
     updated = cursor.rowcount
     conn.close()
 
@@ -280,13 +621,30 @@ def update_employee(employee_id):
 
 # PROJECT ENDPOINTS
 @app.route('/api/projects', methods=['GET'])
+@conditional('PROJECT')
 def projects():
-    conn = get_db_connection()
     try:
-        projects = conn.execute('SELECT * FROM project').fetchall()
-        return jsonify([dict(row) for row in projects])
-    finally:
-        conn.close()
+        limit, after = get_page_args()
+        after = int(after) if after else 0
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
+
+    def load():
+        conn = get_db_connection()
+        try:
+            if limit is None:
+                projects = conn.execute('SELECT * FROM project').fetchall()
+                return [dict(row) for row in projects]
+
+            projects = conn.execute(
+                'SELECT * FROM project WHERE project_id > ? ORDER BY project_id LIMIT ?',
+                (after, limit + 1)
+            ).fetchall()
+            return page_payload(projects, limit, lambda row: str(row['project_id']))
+        finally:
+            conn.close()
+
+    return jsonify(read_cache.get_or_load(('projects', 'list', g.data_version, limit, after), load))
 
 @app.route('/api/projects', methods=['POST'])
 @authorize(['super_admin', 'admin'])
@@ -303,6 +661,7 @@ def add_project():
                 data.get('project_end'), data.get('budget', 0))
         )
         conn.commit()
+        read_cache.invalidate('projects')
         return jsonify({
             'project_id': cursor.lastrowid,
             'project_name': data['project_name']
@@ -318,6 +677,7 @@ def delete_project(project_id):
     
     cursor.execute("DELETE FROM project WHERE project_id = ?", (project_id,))
     conn.commit()
+    read_cache.invalidate('projects')
     affected_rows = cursor.rowcount
     conn.close()
     
@@ -329,15 +689,36 @@ def delete_project(project_id):
 # DEPLOYMENT ENDPOINTS
 @app.route('/api/deployments/employee/<int:employee_id>', methods=['GET'])
 @authorize(['super_admin', 'admin'])
+@conditional('DEPLOYMENT_LIST', 'PROJECT')
 def get_employee_deployments(employee_id):
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    try:
+        for value in (start_date, end_date):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+
+    # Range conditions on date ride the (employee_id, date) index
+    query = '''
+        SELECT d.*, p.project_name
+        FROM deployment_list d
+        JOIN project p ON d.project_id = p.project_id
+        WHERE d.employee_id = ?
+    '''
+    params = [employee_id]
+    if start_date:
+        query += ' AND d.date >= ?'
+        params.append(start_date)
+    if end_date:
+        query += ' AND d.date <= ?'
+        params.append(end_date)
+    query += ' ORDER BY d.date'
+
     conn = get_db_connection()
     try:
-        deployments = conn.execute('''
-            SELECT d.*, p.project_name
-            FROM deployment_list d
-            JOIN project p ON d.project_id = p.project_id
-            WHERE d.employee_id = ?
-        ''', (employee_id,)).fetchall()
+        deployments = conn.execute(query, params).fetchall()
         return jsonify([dict(row) for row in deployments])
     finally:
         conn.close()
@@ -348,7 +729,7 @@ def add_deployment():
     data = request.json
     try:
         attendance_hours = compute_attendance_hours(data['time_in'], data['time_out'])
-        overtime = max(0, attendance_hours - 8)
+        overtime = max(0, attendance_hours - REGULAR_HOURS)
         
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -367,18 +748,87 @@ def add_deployment():
     finally:
         conn.close()
 
+@app.route('/api/deployments/batch', methods=['POST'])
+@authorize(['super_admin', 'admin'])
+def add_deployments_batch():
+    # Body is a JSON array of deployments (or {"deployments": [...]}). A row for an
+    # existing (employee_id, project_id, date) replaces the earlier punch.
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('deployments')
+    if not isinstance(data, list):
+        return jsonify({'error': 'Expected a JSON array of deployments'}), 400
+
+    # Parse and compute hours for the whole batch before touching the database
+    rows = []
+    results = []
+    date_cache = {}
+    for index, item in enumerate(data):
+        try:
+            employee_id = int(item['employee_id'])
+            project_id = int(item['project_id'])
+            date = item['date']
+            if date not in date_cache:
+                date_cache[date] = datetime.strptime(date, "%Y-%m-%d").date().isoformat()
+            minutes = parse_clock_minutes(item['time_out']) - parse_clock_minutes(item['time_in'])
+            if minutes <= 0:
+                raise ValueError("Time out must be after time in")
+        except KeyError as e:
+            results.append({'row': index, 'status': 'error', 'error': f"Missing field {e}"})
+            continue
+        except (TypeError, ValueError, AttributeError) as e:
+            results.append({'row': index, 'status': 'error', 'error': str(e) or 'Invalid row'})
+            continue
+
+        attendance_hours = minutes / 60
+        overtime = max(0, attendance_hours - REGULAR_HOURS)
+        rows.append((employee_id, project_id, item['time_in'], item['time_out'],
+                     overtime, date_cache[date], attendance_hours))
+        results.append({'row': index, 'status': 'saved',
+                        'attendance_hours': attendance_hours, 'overtime_hours': overtime})
+
+    if rows:
+        conn = get_db_connection()
+        try:
+            conn.executemany('''
+                INSERT INTO deployment_list
+                (employee_id, project_id, time_in, time_out,
+                 overtime_hours, date, attendance_hours)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(employee_id, project_id, date) DO UPDATE SET
+                    time_in = excluded.time_in,
+                    time_out = excluded.time_out,
+                    overtime_hours = excluded.overtime_hours,
+                    attendance_hours = excluded.attendance_hours
+            ''', rows)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            return jsonify({'error': str(e)}), 500
+        finally:
+            conn.close()
+
+    return jsonify({
+        'saved': len(rows),
+        'failed': len(results) - len(rows),
+        'results': results
+    }), 201 if rows else 400
+
 @app.route('/api/deployments/project/<int:project_id>', methods=['GET'])
 @authorize(['super_admin', 'admin'])
+@conditional('DEPLOYMENT_LIST', 'EMPLOYEE')
 def get_project_deployments(project_id):
     conn = get_db_connection()
+    cursor = conn.execute('''
+        SELECT d.*, e.firstname, e.lastname
+        FROM deployment_list d
+        JOIN employee e ON d.employee_id = e.employee_id
+        WHERE d.project_id = ?
+    ''', (project_id,))
+    if wants_stream():
+        return stream_rows(conn, cursor)
     try:
-        deployments = conn.execute('''
-            SELECT d.*, e.firstname, e.lastname
-            FROM deployment_list d
-            JOIN employee e ON d.employee_id = e.employee_id
-            WHERE d.project_id = ?
-        ''', (project_id,)).fetchall()
-        return jsonify([dict(row) for row in deployments])
+        return jsonify([dict(row) for row in cursor.fetchall()])
     finally:
         conn.close()
 
@@ -419,6 +869,106 @@ def create_payroll():
     finally:
         conn.close()
 
+@app.route('/api/payroll/run', methods=['POST'])
+@authorize(['super_admin', 'admin'])
+def run_payroll():
+    data = request.json or {}
+    week_start = data.get('week_start')
+    week_end = data.get('week_end')
+    try:
+        if datetime.strptime(week_end, "%Y-%m-%d") < datetime.strptime(week_start, "%Y-%m-%d"):
+            return jsonify({'error': 'week_end must not be before week_start'}), 400
+    except (TypeError, ValueError):
+        return jsonify({'error': 'week_start and week_end must be YYYY-MM-DD'}), 400
+
+    # Deductions in the request apply to every employee in the run
+    deductions = data.get('deductions', [])
+    if not isinstance(deductions, list):
+        return jsonify({'error': 'deductions must be a list'}), 400
+    try:
+        deductions = [(d['deduction_type'], float(d['deduction_amount'])) for d in deductions]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Each deduction needs deduction_type and deduction_amount'}), 400
+    total_deductions = sum(amount for _, amount in deductions)
+
+    date_paid = data.get('date_paid') or datetime.now().strftime('%Y-%m-%d')
+    try:
+        datetime.strptime(date_paid, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return jsonify({'error': 'date_paid must be YYYY-MM-DD'}), 400
+    reference_prefix = f"PY{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
+    conn = get_db_connection()
+    try:
+        # Take the write lock up front so the payroll_id range below is ours alone
+        conn.execute('BEGIN IMMEDIATE')
+
+        # Employees already paid for this exact period are skipped, so a run can be retried
+        totals = conn.execute('''
+            SELECT e.employee_id, e.firstname, e.lastname, e.daily_rate,
+                   COUNT(DISTINCT d.date) AS days_worked,
+                   SUM(d.attendance_hours) AS total_hours,
+                   SUM(d.overtime_hours) AS overtime_hours,
+                   COUNT(DISTINCT d.date) * e.daily_rate
+                       + SUM(d.overtime_hours) * (e.daily_rate / ? * ?) AS gross_salary
+            FROM deployment_list d
+            JOIN employee e ON d.employee_id = e.employee_id
+            WHERE d.date BETWEEN ? AND ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM payroll p
+                  WHERE p.employee_id = e.employee_id
+                    AND p.week_start = ? AND p.week_end = ?
+              )
+            GROUP BY e.employee_id
+            ORDER BY e.employee_id
+        ''', (REGULAR_HOURS, OVERTIME_RATE, week_start, week_end, week_start, week_end)).fetchall()
+
+        results = []
+        for row in totals:
+            result = dict(row)
+            result['net_salary'] = row['gross_salary'] - total_deductions
+            results.append(result)
+
+        payroll_ids = insert_many_returning_ids(conn, 'payroll', 'payroll_id', '''
+            INSERT INTO PAYROLL
+            (employee_id, gross_salary, net_salary, week_start, week_end)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(r['employee_id'], r['gross_salary'], r['net_salary'], week_start, week_end)
+              for r in results])
+
+        for result, payroll_id in zip(results, payroll_ids):
+            result['payroll_id'] = payroll_id
+            result['reference_number'] = f"{reference_prefix}-{result['employee_id']}"
+
+        conn.executemany('''
+            INSERT INTO DEDUCTION
+            (payroll_id, deduction_type, deduction_amount)
+            VALUES (?, ?, ?)
+        ''', [(r['payroll_id'], deduction_type, amount)
+              for r in results for deduction_type, amount in deductions])
+
+        conn.executemany('''
+            INSERT INTO pay_record
+            (employee_id, date_paid, amount, reference_number)
+            VALUES (?, ?, ?, ?)
+        ''', [(r['employee_id'], date_paid, r['net_salary'], r['reference_number'])
+              for r in results])
+
+        conn.commit()
+        return jsonify({
+            'week_start': week_start,
+            'week_end': week_end,
+            'employee_count': len(results),
+            'total_gross': sum(r['gross_salary'] for r in results),
+            'total_net': sum(r['net_salary'] for r in results),
+            'payrolls': results
+        }), 201
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
+
 @app.route('/api/payroll/<int:payroll_id>', methods=['DELETE'])
 @authorize(['super_admin'])
 def delete_payroll(payroll_id):
@@ -438,12 +988,28 @@ def delete_payroll(payroll_id):
 # DEDUCTION ENDPOINTS
 @app.route('/api/deductions', methods=['GET', 'POST'])
 @authorize(['super_admin'])
+@conditional('DEDUCTION')
 def deductions():
     if request.method == 'GET':
+        try:
+            limit, after = get_page_args()
+            after = int(after) if after else 0
+        except ValueError:
+            return jsonify({'error': 'Invalid limit or cursor'}), 400
+
         conn = get_db_connection()
-        deductions = conn.execute('SELECT * FROM deduction').fetchall()
-        conn.close()
-        return jsonify([dict(row) for row in deductions])
+        try:
+            if limit is None:
+                deductions = conn.execute('SELECT * FROM deduction').fetchall()
+                return jsonify([dict(row) for row in deductions])
+
+            deductions = conn.execute(
+                'SELECT * FROM deduction WHERE deduction_id > ? ORDER BY deduction_id LIMIT ?',
+                (after, limit + 1)
+            ).fetchall()
+            return page_response(deductions, limit, lambda row: str(row['deduction_id']))
+        finally:
+            conn.close()
     
     elif request.method == 'POST':
         data = request.json
@@ -477,17 +1043,305 @@ def add_pay_record():
 
 @app.route('/api/payrecords', methods=['GET'])
 @authorize(['super_admin', 'admin'])
+@conditional('PAY_RECORD', 'EMPLOYEE')
 def get_pay_records():
+    # Pay records page newest first, so the cursor is "<date_paid>|<pay_id>"
+    try:
+        limit, after = get_page_args()
+        if after:
+            after_date, after_id = after.rsplit('|', 1)
+            after_id = int(after_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
+
     conn = get_db_connection()
     cursor = conn.cursor()
-    pay_records = cursor.execute('''
-        SELECT pr.*, e.firstname, e.lastname 
+    if limit is None:
+        cursor.execute('''
+            SELECT pr.*, e.firstname, e.lastname 
+            FROM pay_record pr
+            JOIN employee e ON pr.employee_id = e.employee_id
+            ORDER BY date_paid DESC
+        ''')
+        if wants_stream():
+            return stream_rows(conn, cursor)
+        pay_records = cursor.fetchall()
+        conn.close()
+        return jsonify([dict(row) for row in pay_records]), 200
+
+    where = 'WHERE (pr.date_paid, pr.pay_id) < (?, ?)' if after else ''
+    params = (after_date, after_id, limit + 1) if after else (limit + 1,)
+    pay_records = cursor.execute(f'''
+        SELECT pr.*, e.firstname, e.lastname
         FROM pay_record pr
         JOIN employee e ON pr.employee_id = e.employee_id
-        ORDER BY date_paid DESC
-    ''').fetchall()
+        {where}
+        ORDER BY pr.date_paid DESC, pr.pay_id DESC
+        LIMIT ?
+    ''', params).fetchall()
     conn.close()
-    return jsonify([dict(row) for row in pay_records]), 200
+    return page_response(pay_records, limit,
+                         lambda row: f"{row['date_paid']}|{row['pay_id']}"), 200
+
+# REPORT ENDPOINTS
+@app.route('/api/reports/project-costs', methods=['GET'])
+@authorize(['super_admin', 'admin'])
+@conditional('PROJECT', 'DEPLOYMENT_LIST', 'EMPLOYEE')
+def get_project_costs():
+    # Costed like payroll: an employee's daily rate once per day worked, split
+    # across that day's deployments by attendance hours (evenly if none were
+    # recorded), plus each deployment's overtime at the payroll rate.
+    # ?start_date=&end_date= bound the deployments, ?project_ids=1,2 the projects.
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    project_ids = request.args.get('project_ids')
+    try:
+        for value in (start_date, end_date):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    try:
+        project_ids = [int(value) for value in project_ids.split(',')] if project_ids else None
+    except ValueError:
+        return jsonify({'error': 'project_ids must be a comma-separated list of ids'}), 400
+
+    params = {'regular_hours': REGULAR_HOURS, 'overtime_rate': OVERTIME_RATE,
+              'start_date': start_date, 'end_date': end_date,
+              'project_ids': json.dumps(project_ids)}
+    date_filter = ''
+    if start_date:
+        date_filter += ' AND d.date >= :start_date'
+    if end_date:
+        date_filter += ' AND d.date <= :end_date'
+    project_filter = ''
+    if project_ids is not None:
+        project_filter = ' AND {}.project_id IN (SELECT value FROM json_each(:project_ids))'
+
+    # labor charges every deployment a full day from idx_deployment_project_cost.
+    # Days with more than one deployment are rare, so they are found from the
+    # narrow (employee_id, date) index and the excess is taken off in overlap.
+    # Those days are found across all projects, so a project filter cannot
+    # change how a day is split.
+    conn = get_db_connection()
+    try:
+        projects = conn.execute(f'''
+            WITH labor AS (
+                SELECT d.project_id,
+                       COUNT(*) AS deployment_days,
+                       SUM(d.attendance_hours) AS labor_hours,
+                       SUM(d.overtime_hours) AS overtime_hours,
+                       SUM(e.daily_rate + d.overtime_hours
+                           * (e.daily_rate / :regular_hours * :overtime_rate)) AS labor_cost
+                FROM deployment_list d
+                JOIN employee e ON d.employee_id = e.employee_id
+                WHERE 1 {date_filter}{project_filter.format('d')}
+                GROUP BY d.project_id
+            ),
+            shared_day AS (
+                SELECT d.employee_id, d.date
+                FROM deployment_list d
+                WHERE 1 {date_filter}
+                GROUP BY d.employee_id, d.date
+                HAVING COUNT(*) > 1
+            ),
+            shared AS (
+                SELECT d.project_id, d.employee_id, d.attendance_hours,
+                       SUM(d.attendance_hours) OVER day AS day_hours,
+                       COUNT(*) OVER day AS day_deployments
+                FROM shared_day s
+                JOIN deployment_list d ON d.employee_id = s.employee_id AND d.date = s.date
+                WINDOW day AS (PARTITION BY d.employee_id, d.date)
+            ),
+            overlap AS (
+                SELECT s.project_id,
+                       SUM(e.daily_rate * (1 - COALESCE(s.attendance_hours / NULLIF(s.day_hours, 0),
+                                                        1.0 / s.day_deployments))) AS excess_cost
+                FROM shared s
+                JOIN employee e ON s.employee_id = e.employee_id
+                WHERE 1 {project_filter.format('s')}
+                GROUP BY s.project_id
+            )
+            SELECT p.project_id, p.project_name, p.budget,
+                   COALESCE(l.deployment_days, 0) AS deployment_days,
+                   COALESCE(l.labor_hours, 0) AS labor_hours,
+                   COALESCE(l.overtime_hours, 0) AS overtime_hours,
+                   COALESCE(l.labor_cost - COALESCE(o.excess_cost, 0), 0) AS labor_cost,
+                   p.budget - COALESCE(l.labor_cost - COALESCE(o.excess_cost, 0), 0) AS remaining_budget
+            FROM project p
+            LEFT JOIN labor l ON l.project_id = p.project_id
+            LEFT JOIN overlap o ON o.project_id = p.project_id
+            WHERE 1 {project_filter.format('p')}
+            ORDER BY p.project_id
+        ''', params).fetchall()
+    finally:
+        conn.close()
+
+    projects = [dict(row) for row in projects]
+    return jsonify({
+        'start_date': start_date,
+        'end_date': end_date,
+        'project_count': len(projects),
+        'total_labor_cost': sum(p['labor_cost'] for p in projects),
+        'projects': projects
+    }), 200
+
+# CHANGE FEED
+# Entries older than the retention window are deleted; a client whose
+# position falls behind that gets 410 and must reload in full
+CHANGE_LOG_RETENTION = 7 * 24 * 60 * 60  # seconds
+CHANGE_LOG_COMPACT_INTERVAL = 60 * 60  # seconds between compactions per process
+
+last_change_log_compaction = 0.0
+
+def change_log_head(conn):
+    # sqlite_sequence keeps the last seq even when the log itself is empty
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'CHANGE_LOG'").fetchone()
+    return row[0] if row else 0
+
+def compact_change_log(conn):
+    global last_change_log_compaction
+    now = time.time()
+    if now - last_change_log_compaction < CHANGE_LOG_COMPACT_INTERVAL:
+        return
+    last_change_log_compaction = now
+
+    # Deleting by seq keeps the retained log a contiguous suffix even if the
+    # clock stepped back at some point
+    deleted = conn.execute('''
+        DELETE FROM change_log
+        WHERE seq <= (SELECT MAX(seq) FROM change_log WHERE changed_at < ?)
+    ''', (int(now - CHANGE_LOG_RETENTION),)).rowcount
+    conn.commit()
+    if deleted:
+        app.logger.info("Compacted %d change log entries", deleted)
+
+@app.route('/api/changes', methods=['GET'])
+@authorize(['super_admin', 'admin'])
+def get_changes():
+    # Without ?since= only the current position is returned, for a client to
+    # take before its first full load. ?tables= limits the feed to some tables.
+    since = request.args.get('since')
+    tables = request.args.get('tables')
+    try:
+        limit = min(int(request.args.get('limit', MAX_PAGE_SIZE)), MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        since = int(since) if since is not None else None
+    except ValueError:
+        return jsonify({'error': 'Invalid since or limit'}), 400
+    tables = tables.split(',') if tables else list(CHANGE_LOGGED_TABLES)
+    if any(table not in CHANGE_LOGGED_TABLES for table in tables):
+        return jsonify({'error': 'Unknown table'}), 400
+
+    conn = get_db_connection()
+    try:
+        compact_change_log(conn)
+        if since is None:
+            return jsonify({'changes': [], 'last_seq': change_log_head(conn), 'has_more': False}), 200
+
+        oldest = conn.execute('SELECT MIN(seq) FROM change_log').fetchone()[0]
+        head = change_log_head(conn)
+        if since < head and (oldest is None or since < oldest - 1):
+            return jsonify({'error': 'since is older than the retained change log',
+                            'last_seq': head}), 410
+        if since > head:
+            # A position the log never reached, e.g. from before a restore
+            return jsonify({'error': 'since is ahead of the change log',
+                            'last_seq': head}), 410
+
+        entries = conn.execute('''
+            SELECT seq, table_name, row_id, row_key, op
+            FROM change_log
+            WHERE seq > ? AND table_name IN (SELECT value FROM json_each(?))
+            ORDER BY seq
+            LIMIT ?
+        ''', (since, json.dumps(tables), limit + 1)).fetchall()
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        # Only the latest change per row within the page matters to a client
+        latest = {}
+        for entry in entries:
+            latest.pop((entry['table_name'], entry['row_key']), None)
+            latest[(entry['table_name'], entry['row_key'])] = entry
+        changes = list(latest.values())
+
+        # Current row state, fetched once per table by rowid
+        rows = {}
+        for table in tables:
+            ids = [change['row_id'] for change in changes
+                   if change['table_name'] == table and change['op'] != 'delete']
+            if ids:
+                for row in conn.execute(
+                        f'SELECT rowid AS _rowid, * FROM {table} WHERE rowid IN (SELECT value FROM json_each(?))',
+                        (json.dumps(ids),)):
+                    row = dict(row)
+                    rows[(table, row.pop('_rowid'))] = row
+    finally:
+        conn.close()
+
+    def current_row(change, key):
+        # DEPLOYMENT_LIST rowids can be reused, so the row must still carry the key
+        row = rows.get((change['table_name'], change['row_id']))
+        if row and all(row[column] == value for column, value in key.items()):
+            return row
+        return None
+
+    feed = []
+    for change in changes:
+        key = json.loads(change['row_key'])
+        feed.append({
+            'seq': change['seq'],
+            'table': change['table_name'],
+            'row_id': change['row_id'],
+            'key': key,
+            'op': change['op'],
+            'row': current_row(change, key),
+        })
+
+    return jsonify({
+        'changes': feed,
+        'last_seq': entries[-1]['seq'] if entries else since,
+        'has_more': has_more,
+    }), 200
+
+# DIAGNOSTIC ENDPOINTS
+@app.route('/api/_metrics', methods=['GET'])
+def get_metrics():
+    # Scraped from the same box, so only loopback callers are served
+    if request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({'error': 'Forbidden'}), 403
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/_pool', methods=['GET'])
+@authorize(['super_admin'])
+def get_pool_stats():
+    return jsonify(db_pool.stats()), 200
+
+@app.route('/api/_tokens', methods=['GET'])
+@authorize(['super_admin'])
+def get_token_cache_stats():
+    return jsonify(token_cache.stats()), 200
+
+@app.route('/api/_login', methods=['GET'])
+@authorize(['super_admin'])
+def get_login_stats():
+    return jsonify(login_latency.stats()), 200
+
+@app.route('/api/_sql', methods=['GET'])
+@authorize(['super_admin'])
+def get_sql_stats():
+    return jsonify({
+        'slow_threshold_ms': SLOW_QUERY_THRESHOLD * 1000,
+        'endpoints': sql_profiler.stats(),
+        'slow_queries': sql_profiler.slow_queries()
+    }), 200
+
+@app.route('/api/_cache', methods=['GET'])
+@authorize(['super_admin'])
+def get_read_cache_stats():
+    return jsonify(read_cache.stats()), 200
 
 # Initialize and run the server
 if __name__ == '__main__':
@@ -0,0 +1,222 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('payroll.sql')
+
+# Statements that have no useful query plan
+UNPLANNED_PREFIXES = ('BEGIN', 'COMMIT', 'ROLLBACK', 'PRAGMA', 'SAVEPOINT', 'RELEASE', 'CREATE', 'DROP')
+
+# A table reference and its optional alias, as plans name a table by its alias
+TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    return ' '.join(sql.split())
+
+
+def table_names(conn, sql, tables=None):
+    # The given tables (default: all of the database's own) plus whatever
+    # aliases the statement gives them
+    if tables is None:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    tables = {table.lower() for table in tables}
+    names = set(tables)
+    for table, alias in TABLE_REF.findall(sql):
+        if alias and table.lower() in tables:
+            names.add(alias.lower())
+    return names
+
+
+def is_full_scan(plan, tables):
+    # "SCAN t" (or "SCAN TABLE t" on older sqlite) without an index means a full
+    # table scan. Scans of CTEs, subqueries and constant rows are not counted.
+    for step in plan:
+        words = step.split()
+        if words[:1] != ['SCAN'] or 'USING' in words or len(words) < 2:
+            continue
+        name = words[2] if words[1] == 'TABLE' and len(words) > 2 else words[1]
+        if name.lower() in tables:
+            return True
+    return False
+
+
+class SQLProfiler:
+    """Collects per-endpoint timings for every statement run through a wrapped
+    connection, and keeps a log of statements slower than slow_threshold
+    together with their EXPLAIN QUERY PLAN output. Slow statements that scan
+    one of full_scan_tables (default: any real table) are flagged as full scans."""
+
+    def __init__(self, slow_threshold=0.1, slow_log_size=200, full_scan_tables=None):
+        self.slow_threshold = slow_threshold
+        self.full_scan_tables = full_scan_tables
+        self._stats = {}
+        self._slow_log = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def wrap(self, conn, endpoint):
+        return ProfiledConnection(conn, self, endpoint or '<none>')
+
+    def record(self, conn, endpoint, sql, params, params_count, duration, rows):
+        text = normalize_sql(sql)
+        with self._lock:
+            entry = self._stats.setdefault((endpoint, text), {
+                'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'params': params_count,
+            })
+            entry['count'] += 1
+            entry['total_ms'] += duration * 1000
+            entry['max_ms'] = max(entry['max_ms'], duration * 1000)
+            entry['rows'] += rows
+
+        if duration >= self.slow_threshold:
+            plan = self.explain(conn, sql, params)
+            slow = {
+                'endpoint': endpoint,
+                'sql': text,
+                'params': params_count,
+                'duration_ms': round(duration * 1000, 3),
+                'rows': rows,
+                'plan': plan,
+                'full_scan': is_full_scan(plan, table_names(conn, sql, self.full_scan_tables)),
+                'at': time.time(),
+            }
+            with self._lock:
+                self._slow_log.append(slow)
+            logger.warning("Slow query on %s (%.1f ms, %d rows%s): %s | plan: %s",
+                           endpoint, slow['duration_ms'], rows,
+                           ', FULL SCAN' if slow['full_scan'] else '', text, '; '.join(plan))
+
+    def explain(self, conn, sql, params):
+        if sql.lstrip().upper().startswith(UNPLANNED_PREFIXES):
+            return []
+        try:
+            return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        except Exception as e:
+            return [f"<unavailable: {e}>"]
+
+    def stats(self):
+        with self._lock:
+            endpoints = {}
+            for (endpoint, sql), entry in self._stats.items():
+                endpoints.setdefault(endpoint, []).append({
+                    'sql': sql,
+                    'count': entry['count'],
+                    'params': entry['params'],
+                    'rows': entry['rows'],
+                    'total_ms': round(entry['total_ms'], 3),
+                    'avg_ms': round(entry['total_ms'] / entry['count'], 3),
+                    'max_ms': round(entry['max_ms'], 3),
+                })
+            for statements in endpoints.values():
+                statements.sort(key=lambda s: s['total_ms'], reverse=True)
+            return endpoints
+
+    def slow_queries(self):
+        with self._lock:
+            return list(self._slow_log)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow_log.clear()
+
+
+class ProfiledConnection:
+    def __init__(self, conn, profiler, endpoint):
+        self._conn = conn
+        self._profiler = profiler
+        self._endpoint = endpoint
+        self._cursors = []
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self):
+        cursor = ProfiledCursor(self._conn.cursor(), self)
+        self._cursors.append(cursor)
+        return cursor
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def close(self):
+        # Statements are recorded once their rows have been read, at the latest here
+        for cursor in self._cursors:
+            cursor.finish()
+        self._cursors = []
+        self._conn.close()
+
+
+class ProfiledCursor:
+    def __init__(self, cursor, conn):
+        self._cursor = cursor
+        self._conn = conn
+        self._pending = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _run(self, method, sql, params, params_count):
+        self.finish()
+        start = time.perf_counter()
+        method(sql, params)
+        self._pending = [sql, params, params_count, time.perf_counter() - start, 0]
+        return self
+
+    def execute(self, sql, params=()):
+        return self._run(self._cursor.execute, sql, params, len(params))
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        self._run(self._cursor.executemany, sql, seq_of_params,
+                  sum(len(params) for params in seq_of_params))
+        # Explain with the first row's parameters if this one turns out slow
+        self._pending[1] = seq_of_params[0] if seq_of_params else ()
+        return self
+
+    def _timed_fetch(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        if self._pending is not None:
+            self._pending[3] += time.perf_counter() - start
+        return result
+
+    def fetchone(self):
+        row = self._timed_fetch(self._cursor.fetchone)
+        if row is not None and self._pending is not None:
+            self._pending[4] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed_fetch(self._cursor.fetchmany, size or self._cursor.arraysize)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(self._cursor.fetchall)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+        self.finish()
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                self.finish()
+                return
+            yield row
+
+    def finish(self):
+        if self._pending is None:
+            return
+        sql, params, params_count, duration, rows = self._pending
+        self._pending = None
+        self._conn._profiler.record(self._conn._conn, self._conn._endpoint,
+                                    sql, params, params_count, duration, rows)
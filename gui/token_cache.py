@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """Bounded LRU of verified token -> claims. Entries expire after ttl seconds
+    or at the token's own exp, whichever comes first."""
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at <= now:
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return claims
+
+    def put(self, token, claims):
+        expires_at = min(time.time() + self.ttl, claims.get('exp', float('inf')))
+        with self._lock:
+            self._entries[token] = (claims, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+class RevocationList:
+    """Set of revoked token ids (jti) for the request path. The shared copy
+    lives in the database; the owner reloads this one through replace() when
+    due() says the refresh interval has passed and the version has moved."""
+
+    def __init__(self, refresh_interval=1.0):
+        self.refresh_interval = refresh_interval
+        self.version = None
+        self._revoked = {}
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti):
+        return jti in self._revoked
+
+    def revoke(self, jti, exp):
+        with self._lock:
+            self._revoked[jti] = exp
+
+    def due(self):
+        # True for one caller per interval, so only one thread refreshes
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.refresh_interval:
+                return False
+            self._checked_at = now
+            return True
+
+    def replace(self, revoked, version):
+        now = time.time()
+        with self._lock:
+            self._revoked = {jti: exp for jti, exp in revoked if exp > now}
+            self.version = version
@@ -1,12 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import requests
+from dispatcher import show_server_error
 
 class UserCreationWindow(tk.Toplevel):
-    def __init__(self, parent, api_url, token):
+    def __init__(self, parent, api, dispatcher):
         super().__init__(parent)
-        self.api_url = api_url
-        self.token = token
+        self.api = api
+        self.dispatcher = dispatcher
         self.title("Create New User")
 
         ttk.Label(self, text="Username:").grid(row=0, column=0, sticky="e", padx=5, pady=5)
@@ -41,12 +41,7 @@ class UserCreationWindow(tk.Toplevel):
             "role": role
         }
 
-        try:
-            response = requests.post(
-                f"{self.api_url}/users",
-                json=data,
-                headers={"Authorization": f"Bearer {self.token}"}
-            )
+        def created(response):
             if response.status_code == 201:
                 messagebox.showinfo("Success", f"User '{username}' created successfully!")
                 self.username_entry.delete(0, tk.END)
@@ -56,5 +51,7 @@ class UserCreationWindow(tk.Toplevel):
                 messagebox.showerror("Error", "Username already exists.")
             else:
                 messagebox.showerror("Error", f"Failed to create user: {response.text}")
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Error", f"Server error: {e}")
\ No newline at end of file
+
+        self.dispatcher.submit(
+            lambda: self.api.post("/users", json=data),
+            created, show_server_error)
\ No newline at end of file